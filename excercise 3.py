@@ -3,17 +3,26 @@ Student Manager — Modern UI with Theme Switcher (Dark <-> Warm Light)
 File format expected: studentMarks.txt
 First line: number of students (n)
 Each following line: id,name,c1,c2,c3,exam
+Records, storage and sorting live in student_core.py.
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from PIL import Image, ImageTk
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import os
+import queue
+import threading
+
+from student_core import (FILENAME, GRADING_FILE, MARK_FIELDS, STANDARD_SCHEME, BackgroundWriter,
+                          BinaryBackend, EditHistory, FileWatcher, MappedRoster, Roster, RosterIngest, RosterStats,
+                          SortCache, NameIndex, Student, adjust_marks, apply_bulk, apply_change, apply_step,
+                          bisect_position, copy_values, edit_step, grading_scheme, load_grading_schemes,
+                          marks_over, open_backend, parse_bulk_rows, profiler, read_roster_values, reconcile,
+                          regrade, replay_values, search_matches, step_to, student_values, use_grading_scheme)
+from student_reports import generate_reports
 
 # -----------------------
 # Configuration / Colors
 # -----------------------
-FILENAME = "studentMarks.txt"
 
 # Theme palettes
 THEMES = {
@@ -26,7 +35,8 @@ THEMES = {
         "good": "#39D353",
         "bad": "#FF6B6B",
         "card": "#222235",
-        "button_bg": "#2a2a3a"
+        "button_bg": "#2a2a3a",
+        "image": "classroom.png"
     },
     "warm": {  # L3: Warm Light Mode (ivory / beige)
         "bg": "#FBF7F0",
@@ -37,85 +47,247 @@ THEMES = {
         "good": "#2E7D32",
         "bad": "#C62828",
         "card": "#FFF8F0",
-        "button_bg": "#ECDCCF"
+        "button_bg": "#ECDCCF",
+        "image": None  # flat colour
     }
 }
 
 # -----------------------
-# Utility functions
-# -----------------------
-def calc_metrics(c1, c2, c3, exam):
-    coursework = c1 + c2 + c3
-    total = coursework + exam
-    percentage = (total / 160.0) * 100.0
-    if percentage >= 70:
-        grade = "A"
-    elif percentage >= 60:
-        grade = "B"
-    elif percentage >= 50:
-        grade = "C"
-    elif percentage >= 40:
-        grade = "D"
-    else:
-        grade = "F"
-    return coursework, total, percentage, grade
+# Roster indexes
+# -----------------------
+# The display order cache, the search index and the statistics follow
+# student_data; every edit reports itself through the notify_* helpers.
+sort_cache = SortCache()
+name_index = NameIndex()
+roster_stats = RosterStats()
+
+def notify_added(s):
+    sort_cache.insert(student_data, s)
+    name_index.insert(student_data, s)
+    roster_stats.insert(student_data, s)
+    mark_dirty("stats")
+
+def notify_updated(s, old):
+    # old: s.copy() from before the edit
+    sort_cache.update(student_data, s)
+    name_index.update(student_data, s, old["name"])
+    roster_stats.update(student_data, s, old)
+    mark_dirty("stats")
+
+def notify_removed(s):
+    sort_cache.remove(student_data, s)
+    name_index.remove(student_data, s)
+    roster_stats.remove(student_data, s)
+    mark_dirty("stats")
 
 # -----------------------
 # File handling
 # -----------------------
-def load_student_data(filename=FILENAME):
-    students = []
-    if not os.path.exists(filename):
-        # create empty file
-        with open(filename, "w") as f:
-            f.write("0\n")
-        return students
-    try:
-        with open(filename, "r") as file:
-            lines = [ln.strip() for ln in file.readlines() if ln.strip()]
-            if not lines:
-                return students
-            try:
-                n = int(lines[0])
-            except:
-                # fallback: treat all lines as records
-                data_lines = lines
-            else:
-                data_lines = lines[1:]
-            for line in data_lines:
-                parts = [p.strip() for p in line.split(",")]
-                if len(parts) != 6:
-                    continue
-                sid = int(parts[0])
-                name = parts[1]
-                c1, c2, c3, exam = map(int, parts[2:])
-                coursework, total, percentage, grade = calc_metrics(c1, c2, c3, exam)
-                students.append({
-                    "id": sid, "name": name,
-                    "c1": c1, "c2": c2, "c3": c3, "exam": exam,
-                    "coursework": coursework, "total": total,
-                    "percentage": percentage, "grade": grade
-                })
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not read {filename}:\n{e}")
-    return students
+# Saves are queued on a BackgroundWriter (student_core), which coalesces
+# bursts of edits and writes them off the UI thread; poll_writer reports
+# the outcome in the status bar while anything is outstanding.
+WRITER_POLL_MS = 100
+
+writer = None       # BackgroundWriter for backend
+writer_poll = None  # after() id while writes are outstanding
+watcher = None      # FileWatcher on backend's files (see Outside changes)
+unsaved = {}        # id -> values before its first edit not yet written (None if added)
+
+def set_backend(new):
+    # switch storage; writes still queued for the old backend finish first
+    global backend, writer, watcher
+    if writer is not None:
+        writer.close()
+        if writer.error is not None:
+            messagebox.showerror("Save Error", f"Could not save {backend.path}:\n{writer.error}")
+    backend = new
+    watcher = FileWatcher(new.watch_paths())
+    writer = BackgroundWriter(new, watcher)
+    unsaved.clear()
+    show_pending()
+
+def mark_unsaved(sid, base):
+    # base: the student's values before the edit, None if it is new
+    unsaved.setdefault(sid, base)
 
 def save_student_data():
-    try:
-        with open(FILENAME, "w") as f:
-            f.write(str(len(student_data)) + "\n")
-            for s in student_data:
-                f.write(f"{s['id']},{s['name']},{s['c1']},{s['c2']},{s['c3']},{s['exam']}\n")
-        set_status("Saved to file.")
-    except Exception as e:
-        messagebox.showerror("Save Error", f"Could not save file:\n{e}")
+    if not roster_complete:
+        messagebox.showerror("Save Error", "The roster is only partly loaded. Reload the file before saving.")
+        return
+    if not backend.writable:
+        messagebox.showerror("Save Error", "This roster was imported from several files. Use Save As to store it.")
+        return
+    writer.save_all(student_data)
+    watch_writer()
+
+def persist_change(s, deleted=False):
+    # queue one add/update/delete; a full save if the backend can't do single rows
+    if not backend.writable:
+        set_status("Changed in memory only. Use Save As to keep the imported roster.")
+        return
+    if not backend.incremental:
+        save_student_data()
+        return
+    if deleted:
+        writer.delete(s.id)
+    else:
+        writer.put(s)
+    watch_writer()
+
+def persist_many(changes):
+    # [("put", s) | ("delete", sid)]: one submission, so one write however many rows
+    if not backend.writable:
+        set_status("Changed in memory only. Use Save As to keep the imported roster.")
+        return
+    if not backend.incremental:
+        save_student_data()
+        return
+    writer.apply_many(changes)
+    watch_writer()
+
+def watch_writer():
+    global writer_poll
+    show_pending()
+    if writer_poll is None:
+        writer_poll = root.after(WRITER_POLL_MS, poll_writer)
+
+def poll_writer():
+    global writer_poll
+    writer_poll = None
+    pending = writer.pending  # read first: results are queued before pending drops
+    while True:
+        try:
+            msg = writer.results.get_nowait()
+        except queue.Empty:
+            break
+        if msg[0] == "saved":
+            set_status(f"Saved {msg[1]} change{'s' if msg[1] != 1 else ''} to {os.path.basename(msg[2])}.")
+        elif msg[0] == "error":
+            set_status("Save failed; your changes are only in memory.")
+            messagebox.showerror("Save Error", f"Could not save {msg[2]}:\n{msg[1]}")
+        elif roster_complete:
+            writer.save_all(student_data)  # "compact": fold the journal into a new snapshot
+            pending = True
+    show_pending()
+    if pending:
+        writer_poll = root.after(WRITER_POLL_MS, poll_writer)
+    elif writer.error is None:
+        unsaved.clear()  # everything edited so far is in the file
+
+def show_pending():
+    n = writer.pending
+    if n:
+        pending_var.set(f"● {n} unsaved change{'s' if n != 1 else ''}")
+    elif writer.error is not None:
+        pending_var.set("● Last save failed")
+    else:
+        pending_var.set("All changes saved")
+
+def exit_action():
+    # File -> Exit and the window's close button: write what is queued, then quit
+    if writer.pending:
+        set_status("Writing pending changes…")
+        root.update_idletasks()
+    writer.flush()
+    if writer.error is not None and not messagebox.askyesno(
+            "Unsaved Changes", f"The last save failed:\n{writer.error}\n\nQuit anyway and lose those changes?"):
+        show_pending()
+        return
+    root.quit()
+
 
 # -----------------------
 # GUI Helpers
 # -----------------------
 def set_status(msg):
-    status_var.set(msg)
+    global status_text
+    status_text = msg
+    mark_dirty("status")
+
+# -----------------------
+# Display refresh
+# -----------------------
+# Handlers mark what they have made stale instead of redrawing it: the
+# theme, the table's rows (the visible window in virtual mode), the detail
+# card, the statistics card and the status text. One after_idle callback
+# then redraws each dirty region once, after Tk has worked through the
+# queued events, so a burst (a held arrow key, wheel scrolling, a run of
+# edits, load progress) costs one redraw rather than one per event.
+# While "table" is dirty the tree's items are stale: the view_* helpers
+# leave them alone, as the rebuild starts from view_rows anyway.
+dirty_regions = set()
+display_pending = None  # after_idle id of the scheduled flush
+status_text = ""        # latest status message
+theme_wanted = None     # theme to switch to on the next flush
+
+def mark_dirty(*regions):
+    global display_pending
+    dirty_regions.update(regions)
+    if display_pending is None:
+        display_pending = root.after_idle(flush_display)
+
+@profiler.timed("refresh")
+def flush_display():
+    # also callable directly, for code that needs the widgets current
+    global display_pending, theme_wanted
+    if display_pending is not None:
+        root.after_cancel(display_pending)
+        display_pending = None
+    regions = set(dirty_regions)
+    dirty_regions.clear()
+    if "theme" in regions and theme_wanted:
+        apply_theme(theme_wanted)
+        theme_wanted = None
+    if "table" in regions:
+        render_rows()
+    if "stats" in regions:
+        show_stats()
+    if "detail" in regions:
+        show_detail(student_data.get(selected_id) if selected_id is not None else None)
+    if "status" in regions:
+        status_var.set(status_text)
+
+# -----------------------
+# Theme engine
+# -----------------------
+# Every themed widget is a ttk widget with a role ("Panel.TFrame",
+# "Side.TButton", ...). build_styles() configures "<theme>.<role>" for each
+# palette once at startup, so switching themes only swaps style names on
+# the registered widgets.
+def theme_roles(pal):
+    return {
+        "Bg.TFrame": dict(background=pal["bg"]),
+        "Panel.TFrame": dict(background=pal["panel"]),
+        "Card.TFrame": dict(background=pal["card"]),
+        "Header.TLabel": dict(background=pal["bg"], foreground=pal["fg"], font=("Segoe UI", 18, "bold")),
+        "Panel.TLabel": dict(background=pal["panel"], foreground=pal["subtext"], font=("Helvetica", 9)),
+        "Status.TLabel": dict(background=pal["panel"], foreground=pal["subtext"], font=("Helvetica", 9)),
+        "CardTitle.TLabel": dict(background=pal["card"], foreground=pal["fg"], font=("Helvetica", 14, "bold")),
+        "CardSub.TLabel": dict(background=pal["card"], foreground=pal["subtext"], font=("Helvetica", 10)),
+        "CardKey.TLabel": dict(background=pal["card"], foreground=pal["subtext"], font=("Helvetica", 9, "bold")),
+        "CardValue.TLabel": dict(background=pal["card"], foreground=pal["fg"], font=("Helvetica", 9)),
+        "CardHint.TLabel": dict(background=pal["card"], foreground=pal["subtext"], font=("Helvetica", 11, "italic")),
+        "Side.TButton": dict(background=pal["button_bg"], foreground=pal["fg"], borderwidth=0, focuscolor=pal["button_bg"]),
+        "Search.TEntry": dict(fieldbackground=pal["card"], foreground=pal["fg"], insertcolor=pal["fg"]),
+        "Treeview": dict(background=pal["bg"], fieldbackground=pal["bg"], foreground=pal["fg"]),
+        "Treeview.Heading": dict(background=pal["panel"], foreground=pal["fg"]),
+    }
+
+themed_widgets = []  # (widget, role)
+
+def build_styles():
+    style.theme_use("clam")  # the platform themes ignore most colour options
+    for name, pal in THEMES.items():
+        for role, options in theme_roles(pal).items():
+            style.configure(f"{name}.{role}", **options)
+        style.map(f"{name}.Side.TButton", background=[("active", pal["accent"])])
 
+def themed(widget, role):
+    themed_widgets.append((widget, role))
+    widget.configure(style=f"{CURRENT_THEME}.{role}")
+    return widget
+
+@profiler.timed("apply_theme")
 def apply_theme(theme_name):
     global CURRENT_THEME
     if theme_name not in THEMES:
@@ -124,190 +296,1015 @@ def apply_theme(theme_name):
     pal = THEMES[theme_name]
 
     root.configure(bg=pal["bg"])
-    main_frame.configure(bg=pal["bg"])
-    left_panel.configure(bg=pal["panel"])
-    right_panel.configure(bg=pal["bg"])
-    controls_frame.configure(bg=pal["panel"])
-    detail_card.configure(bg=pal["card"])
-    status_bar.configure(bg=pal["panel"])
-    # style ttk elements
-    style.configure("TLabel", background=pal["panel"], foreground=pal["fg"])
-    style.configure("Card.TLabel", background=pal["card"], foreground=pal["fg"])
-    style.configure("TButton", background=pal["button_bg"], foreground=pal["fg"])
-    style.map("TButton", background=[("active", pal["accent"])])
-    style.configure("Treeview", background=pal["bg"], fieldbackground=pal["bg"], foreground=pal["fg"])
-    style.configure("Treeview.Heading", background=pal["panel"], foreground=pal["fg"])
-    # Buttons & text colors
-    for btn in (btn_view_all, btn_view_ind, btn_add, btn_update, btn_delete, btn_sort, btn_highest, btn_lowest, btn_reload, theme_toggle_btn):
-        btn.configure(bg=pal["button_bg"], fg=pal["fg"], activebackground=pal["panel"], bd=0, highlightthickness=0)
-    # Treeview tag colors for grades
-    tree.tag_configure("grade_A", foreground=pal["good"])
-    tree.tag_configure("grade_F", foreground=pal["bad"])
+    for widget, role in themed_widgets:
+        widget.configure(style=f"{theme_name}.{role}")
+    # Treeview tag colors for the best and worst grades
+    tree.tag_configure("grade_best", foreground=pal["good"])
+    tree.tag_configure("grade_worst", foreground=pal["bad"])
     tree.tag_configure("grade_other", foreground=pal["fg"])
-    # detail card text
-    for child in detail_card.winfo_children():
-        if isinstance(child, tk.Label):
-            child.configure(bg=pal["card"], fg=pal["fg"])
-    # status
-    status_label.configure(bg=pal["panel"], fg=pal["subtext"])
-    # accent for header label
-    header_label.configure(bg=pal["bg"], fg=pal["fg"])
-    # optional background image handling
-    if bg_photo_img:
-        # show image only in dark theme (makes sense) — warm mode uses flat color
-        if theme_name == "dark" and bg_label is not None:
-            bg_label.lift()
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+    # optional background image: loaded lazily, dropped when the theme has none
+    if theme_image():
+        request_background()
+    else:
+        drop_background()
+
+# -----------------------
+# Background image
+# -----------------------
+# Nothing is decoded at startup. After the first paint (and, debounced,
+# whenever right_panel is resized) a worker thread decodes the theme's
+# image and resizes it to the panel; the result is cached on disk under
+# a name keyed by size and mtime, so the next start just reads it back.
+# PhotoImage objects are only created on the UI thread.
+IMAGE_CACHE_DIR = ".image_cache"
+IMAGE_CACHE_KEEP = 8  # resized variants kept on disk
+IMAGE_DEBOUNCE_MS = 200
+
+bg_label = None       # created with the first image
+bg_photo_img = None   # the PhotoImage on bg_label
+bg_size = None        # (w, h) of bg_photo_img
+bg_source = None      # decoded full-size image, kept while the theme shows it
+bg_pending = None     # after() id of the debounced load
+bg_generation = 0     # bumped per load; results of older loads are dropped
+bg_results = queue.Queue()
+
+def theme_image():
+    path = THEMES[CURRENT_THEME].get("image")
+    return path if path and os.path.exists(path) else None
+
+def request_background(event=None):
+    global bg_pending
+    if bg_pending is not None:
+        root.after_cancel(bg_pending)
+    bg_pending = root.after(IMAGE_DEBOUNCE_MS, load_background)
+
+def load_background():
+    global bg_pending, bg_generation
+    bg_pending = None
+    path = theme_image()
+    size = (right_panel.winfo_width(), right_panel.winfo_height())
+    if not path or size[0] < 2 or size[1] < 2 or size == bg_size:
+        return
+    bg_generation += 1
+    threading.Thread(target=background_worker, args=(bg_generation, path, size, bg_source), daemon=True).start()
+    root.after(LOAD_POLL_MS, poll_background)
+
+def cached_image_path(path, size):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(IMAGE_CACHE_DIR, f"{stem}_{size[0]}x{size[1]}_{os.stat(path).st_mtime_ns}.png")
+
+def background_worker(generation, path, size, source):
+    try:
+        from PIL import Image
+        cached = cached_image_path(path, size)
+        if os.path.exists(cached):
+            im = Image.open(cached)
+            im.load()
         else:
-            bg_label.place_forget()
+            if source is None:
+                source = Image.open(path)
+                source.load()
+            im = source.resize(size, Image.LANCZOS)
+            os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+            tmp = f"{cached}.{threading.get_ident()}.tmp"  # per worker: loads can overlap
+            im.save(tmp, format="PNG")
+            os.replace(tmp, cached)
+            prune_image_cache()
+        bg_results.put((generation, path, size, source, im))
+    except Exception:
+        bg_results.put((generation, path, size, source, None))  # no PIL / unreadable: keep the flat colour
+
+def prune_image_cache():
+    # keep the newest IMAGE_CACHE_KEEP variants; another worker's .tmp is left alone
+    variants = []
+    for name in os.listdir(IMAGE_CACHE_DIR):
+        if not name.endswith(".tmp"):
+            try:
+                variants.append((os.path.getmtime(os.path.join(IMAGE_CACHE_DIR, name)), name))
+            except OSError:
+                pass  # pruned by another worker
+    for mtime, name in sorted(variants)[:-IMAGE_CACHE_KEEP]:
+        try:
+            os.remove(os.path.join(IMAGE_CACHE_DIR, name))
+        except OSError:
+            pass
+
+def poll_background():
+    global bg_label, bg_photo_img, bg_size, bg_source
+    try:
+        generation, path, size, source, im = bg_results.get_nowait()
+    except queue.Empty:
+        root.after(LOAD_POLL_MS, poll_background)
+        return
+    # one poll per load, but results arrive in any order: only the latest load's is shown
+    if generation != bg_generation or im is None or theme_image() != path:
+        return  # superseded, failed, or the theme changed while it was loading
+    from PIL import ImageTk
+    if source is not None:
+        bg_source = source
+    bg_photo_img = ImageTk.PhotoImage(im)
+    bg_size = size
+    if bg_label is None:
+        bg_label = tk.Label(right_panel, bd=0)
+    bg_label.configure(image=bg_photo_img)
+    bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+    bg_label.lower()  # underneath the table and detail card
+
+def drop_background():
+    global bg_photo_img, bg_size, bg_source
+    if bg_label is not None:
+        bg_label.place_forget()
+        bg_label.configure(image="")
+    bg_photo_img = bg_size = bg_source = None
 
 def clear_tree():
-    for item in tree.get_children():
-        tree.delete(item)
+    children = tree.get_children()
+    if children:
+        tree.delete(*children)
+
+def row_values(s):
+    coursework, total, percentage, grade = s.metrics()
+    grades = grading_scheme().grades
+    tag = "grade_best" if grade == grades[0] else ("grade_worst" if grade == grades[-1] else "grade_other")
+    return (
+        s.id, s.name, s.c1, s.c2, s.c3, s.exam,
+        coursework, total, f"{percentage:.2f}", grade
+    ), (tag,)
+
+def search_filter(rows):
+    # the rows matching search_query, in their order
+    if not search_query:
+        return rows
+    ids = name_index.search(student_data, search_query)
+    return [s for s in rows if s.id in ids]
+
+@profiler.timed("populate_tree")
+def populate_tree(rows=None):
+    # rows: the display rows, already filtered and ordered (default: all)
+    global view_rows, view_top, virtual_mode
+    if rows is None:
+        if view_sort:
+            rows = sorted_rows(*view_sort)
+        elif isinstance(student_data, MappedRoster):
+            rows = student_data  # indexed in place: only the visible window is decoded
+        else:
+            rows = list(student_data)
+        rows = search_filter(rows)
+    view_rows = rows
+    virtual_mode = len(view_rows) > VIRTUAL_THRESHOLD
+    view_top = max(0, min(view_top, len(view_rows) - visible_row_count()))
+    mark_dirty("table", "stats")
+    if search_query:
+        set_status(f"{len(view_rows)} of {len(student_data)} students match \"{search_query}\".")
+    else:
+        set_status(f"{len(student_data)} students displayed.")
 
-def populate_tree():
+# -----------------------
+# Virtualized table
+# -----------------------
+# Above VIRTUAL_THRESHOLD rows the tree only holds the rows of the visible
+# window; scrolling moves view_top and rebuilds that window from view_rows.
+VIRTUAL_THRESHOLD = 2000
+COL_KEYS = {"ID": "id", "Name": "name", "C1": "c1", "C2": "c2", "C3": "c3", "Exam": "exam",
+            "Coursework": "coursework", "Total": "total", "Percentage": "percentage", "Grade": "grade"}
+
+view_rows = []      # records in display order
+view_top = 0        # index into view_rows of the first built row
+virtual_mode = False
+selected_id = None  # survives the selected row being scrolled out of the window
+view_focus = -1     # index into view_rows of the last row reached by keyboard
+row_box = None      # (top, height) of a built row, kept for when none is built
+
+def visible_row_count():
+    global row_box
+    children = tree.get_children()
+    box = tree.bbox(children[0]) if children else ""
+    if box:
+        row_box = (box[1], box[3])
+    height = tree.winfo_height()
+    if row_box and height > 1:
+        return max(1, (height - row_box[0]) // row_box[1] + 1)
+    return int(tree.cget("height"))
+
+def render_rows():
+    count = visible_row_count()  # measured before the rows it measures are cleared
     clear_tree()
-    for s in student_data:
-        tag = "grade_A" if s["grade"] == "A" else ("grade_F" if s["grade"] == "F" else "grade_other")
-        tree.insert("", "end", iid=str(s["id"]), values=(
-            s["id"], s["name"], s["c1"], s["c2"], s["c3"], s["exam"],
-            s["coursework"], s["total"], f"{s['percentage']:.2f}", s["grade"]
-        ), tags=(tag,))
-    set_status(f"{len(student_data)} students displayed.")
+    if virtual_mode:
+        rows = view_rows[view_top:view_top + count]
+    else:
+        rows = view_rows
+    for s in rows:
+        values, tags = row_values(s)
+        tree.insert("", "end", iid=str(s["id"]), values=values, tags=tags)
+    if virtual_mode:
+        tree.yview_moveto(0)
+        update_virtual_scrollbar()
+    if selected_id is not None and tree.exists(str(selected_id)):
+        tree.selection_set(str(selected_id))
+        tree.focus(str(selected_id))
+
+def update_virtual_scrollbar():
+    if view_rows:
+        shown = min(visible_row_count(), len(view_rows) - view_top)
+        vsb.set(view_top / len(view_rows), (view_top + shown) / len(view_rows))
+
+def scroll_to(index):
+    global view_top
+    view_top = max(0, min(index, len(view_rows) - visible_row_count() + 1))
+    mark_dirty("table")
+
+def focus_position():
+    # view_focus if it still points at the selected row, else None
+    if 0 <= view_focus < len(view_rows) and view_rows[view_focus]["id"] == selected_id:
+        return view_focus
+    return None
+
+def tree_yview(*args):
+    # scrollbar command; in virtual mode the scroll position is ours, not the tree's
+    if not virtual_mode:
+        tree.yview(*args)
+        return
+    if args[0] == "moveto":
+        scroll_to(int(float(args[1]) * len(view_rows)))
+    elif args[0] == "scroll":
+        step = int(args[1]) * (visible_row_count() - 1 if args[2] == "pages" else 1)
+        scroll_to(view_top + step)
+
+def tree_yscroll(first, last):
+    if not virtual_mode:
+        vsb.set(first, last)
+
+def on_tree_wheel(event):
+    if not virtual_mode:
+        return None
+    if event.num == 4 or event.delta > 0:
+        scroll_to(view_top - 3)
+    else:
+        scroll_to(view_top + 3)
+    return "break"
+
+def on_tree_key(key):
+    # keyboard navigation past the edges of the built window
+    global view_focus
+    if not virtual_mode or not view_rows:
+        return None
+    # a held key outruns the redraw: go on from the row we last moved to
+    pos = focus_position()
+    if pos is None:
+        children = tree.get_children()
+        focus = tree.focus()
+        pos = view_top + children.index(focus) if focus in children else view_top
+    page = max(1, visible_row_count() - 1)
+    target = {"Up": pos - 1, "Down": pos + 1, "Prior": pos - page, "Next": pos + page,
+              "Home": 0, "End": len(view_rows) - 1}[key]
+    view_focus = max(0, min(target, len(view_rows) - 1))
+    reveal_student(view_rows[view_focus])
+    return "break"
+
+def on_tree_resize(event):
+    if virtual_mode:
+        mark_dirty("table")
+
+def reveal_student(s):
+    # select a record and bring it into view; when its window is still to
+    # be built, render_rows selects it
+    global selected_id
+    selected_id = s["id"]
+    iid = str(s["id"])
+    if virtual_mode:
+        index = focus_position()
+        if index is None and "table" not in dirty_regions and tree.exists(iid):
+            index = view_top + tree.index(iid)
+        if index is None:
+            try:
+                index = view_rows.index(s)
+            except ValueError:
+                return
+        full = max(1, visible_row_count() - 1)  # rows not cut off at the bottom
+        if index < view_top:
+            scroll_to(index)
+        elif index >= view_top + full:
+            scroll_to(index - full + 1)
+    if "table" in dirty_regions:
+        if virtual_mode:
+            return
+        flush_display()  # tree.see needs the rows built
+    if tree.exists(iid):
+        tree.selection_set(iid)
+        tree.focus(iid)
+        if not virtual_mode:
+            tree.see(iid)
+
+# -----------------------
+# Incremental view updates
+# -----------------------
+# Single-row edits go through view_insert/view_update/view_remove, which
+# touch one tree item (or rebuild the visible window in virtual mode)
+# instead of repopulating the whole table.
+view_sort = None  # (key, numeric, reverse) of the current display order
+
+def sorted_rows(key, numeric, reverse):
+    # the backend may sort for us only while it holds exactly what we hold:
+    # every write landed and no outside change is waiting to be reconciled
+    trusted = (roster_complete and not writer.pending and writer.error is None
+               and not (watch_reading or watch_again or watcher.changed()))
+    source = backend if trusted else None
+    return sort_cache.rows(student_data, (key, numeric, reverse), source)
+
+def sorted_position(s):
+    # index in view_rows where s belongs under view_sort (after equal keys)
+    if not view_sort:
+        return len(view_rows)
+    return bisect_position(view_rows, s, view_sort)
+
+def window_contains(index):
+    return view_top <= index < view_top + visible_row_count()
+
+def sync_view_mode():
+    # crossing VIRTUAL_THRESHOLD switches modes, which needs one full rebuild
+    global virtual_mode
+    if virtual_mode != (len(view_rows) > VIRTUAL_THRESHOLD):
+        virtual_mode = not virtual_mode
+        mark_dirty("table")
+        return True
+    return False
+
+def view_insert(s):
+    global view_top
+    if search_query and not search_matches(s, search_query):
+        return
+    index = sorted_position(s)
+    view_rows.insert(index, s)
+    if sync_view_mode():
+        return
+    if not virtual_mode:
+        if "table" not in dirty_regions:
+            values, tags = row_values(s)
+            tree.insert("", index, iid=str(s["id"]), values=values, tags=tags)
+    elif index < view_top:
+        view_top += 1  # keep the same rows on screen
+        update_virtual_scrollbar()
+    elif window_contains(index):
+        mark_dirty("table")
+    else:
+        update_virtual_scrollbar()
+
+def view_update(s):
+    try:
+        old = view_rows.index(s)
+    except ValueError:
+        view_insert(s)  # may match the search now
+        return
+    if search_query and not search_matches(s, search_query):
+        view_remove(s)
+        return
+    del view_rows[old]
+    index = sorted_position(s) if view_sort else old
+    view_rows.insert(index, s)
+    if virtual_mode:
+        if window_contains(old) or window_contains(index):
+            mark_dirty("table")
+        return
+    if "table" in dirty_regions:
+        return
+    iid = str(s["id"])
+    values, tags = row_values(s)
+    tree.item(iid, values=values, tags=tags)
+    if index != old:
+        tree.move(iid, "", index)
+
+def view_remove(s):
+    global view_top
+    try:
+        index = view_rows.index(s)
+    except ValueError:
+        return
+    del view_rows[index]
+    if sync_view_mode():
+        return
+    if not virtual_mode:
+        if "table" not in dirty_regions:
+            tree.delete(str(s["id"]))
+    elif index < view_top:
+        view_top -= 1
+        update_virtual_scrollbar()
+    elif window_contains(index):
+        view_top = max(0, min(view_top, len(view_rows) - visible_row_count() + 1))
+        mark_dirty("table")
+    else:
+        update_virtual_scrollbar()
+
+def view_extend(rows):
+    # append a batch in arrival order (the loader re-sorts once at the end)
+    if search_query:
+        rows = [s for s in rows if search_matches(s, search_query)]
+    start = len(view_rows)
+    view_rows.extend(rows)
+    if sync_view_mode():
+        return
+    if not virtual_mode:
+        if "table" not in dirty_regions:
+            for s in rows:
+                values, tags = row_values(s)
+                tree.insert("", "end", iid=str(s["id"]), values=values, tags=tags)
+    elif window_contains(start):
+        mark_dirty("table")
+    else:
+        update_virtual_scrollbar()
 
 def on_tree_select(event):
+    global selected_id
     sel = tree.focus()
-    if not sel:
-        show_detail(None)
+    if not sel or not tree.selection():
+        if virtual_mode and selected_id is not None and not tree.exists(str(selected_id)):
+            return  # selected row was scrolled out of the built window
+        selected_id = None
+        mark_dirty("detail")
         return
-    sid = int(sel)
-    s = next((x for x in student_data if x["id"] == sid), None)
-    show_detail(s)
-
+    selected_id = int(sel)
+    mark_dirty("detail")
+
+DETAIL_FIELDS = ("Coursework (1,2,3)", "Coursework Total", "Exam", "Total Marks", "Percentage", "Grade")
+detail_values = []     # value labels, in DETAIL_FIELDS order
+detail_showing = None  # True while the card shows a student
+
+def build_detail_card():
+    # the card's labels are created once; show_detail only changes their text
+    global detail_hint, detail_title, detail_sub, detail_info
+    detail_hint = themed(ttk.Label(detail_card, text="Select a student to see details"), "CardHint.TLabel")
+    detail_title = themed(ttk.Label(detail_card), "CardTitle.TLabel")
+    detail_sub = themed(ttk.Label(detail_card), "CardSub.TLabel")
+    detail_info = themed(ttk.Frame(detail_card), "Card.TFrame")
+    for i, k in enumerate(DETAIL_FIELDS):
+        themed(ttk.Label(detail_info, text=k + ":", anchor="w"), "CardKey.TLabel").grid(row=i, column=0, sticky="w", padx=(0,6), pady=2)
+        value = themed(ttk.Label(detail_info, anchor="w"), "CardValue.TLabel")
+        value.grid(row=i, column=1, sticky="w", pady=2)
+        detail_values.append(value)
+
+@profiler.timed("show_detail")
 def show_detail(s):
-    for w in detail_card.winfo_children():
-        w.destroy()
+    global detail_showing
     if not s:
-        tk.Label(detail_card, text="Select a student to see details", font=("Helvetica", 11, "italic"), bg=THEMES[CURRENT_THEME]["card"], fg=THEMES[CURRENT_THEME]["subtext"]).pack(padx=8, pady=12)
+        if detail_showing is not False:
+            for w in (detail_title, detail_sub, detail_info):
+                w.pack_forget()
+            detail_hint.pack(padx=8, pady=12)
+            detail_showing = False
         return
+    if not detail_showing:
+        detail_hint.pack_forget()
+        detail_title.pack(anchor="w", padx=12, pady=(10,2))
+        detail_sub.pack(anchor="w", padx=12, pady=(0,8))
+        detail_info.pack(fill="both", expand=True, padx=10, pady=6)
+        detail_showing = True
     # neat info layout
-    tk.Label(detail_card, text=s["name"], font=("Helvetica", 14, "bold"), bg=THEMES[CURRENT_THEME]["card"], fg=THEMES[CURRENT_THEME]["fg"]).pack(anchor="w", padx=12, pady=(10,2))
-    tk.Label(detail_card, text=f"Student ID: {s['id']}", font=("Helvetica", 10), bg=THEMES[CURRENT_THEME]["card"], fg=THEMES[CURRENT_THEME]["subtext"]).pack(anchor="w", padx=12)
-    tk.Frame(detail_card, height=8, bg=THEMES[CURRENT_THEME]["card"]).pack()  # spacer
-
-    info_frame = tk.Frame(detail_card, bg=THEMES[CURRENT_THEME]["card"])
-    info_frame.pack(fill="both", expand=True, padx=10, pady=6)
-
-    lbls = [
-        ("Coursework (1,2,3)", f"{s['c1']}, {s['c2']}, {s['c3']}"),
-        ("Coursework Total", str(s['coursework'])),
-        ("Exam", str(s['exam'])),
-        ("Total Marks", str(s['total'])),
-        ("Percentage", f"{s['percentage']:.2f}%"),
-        ("Grade", s['grade'])
-    ]
-    for i, (k, v) in enumerate(lbls):
-        tk.Label(info_frame, text=k + ":", anchor="w", font=("Helvetica", 9, "bold"), bg=THEMES[CURRENT_THEME]["card"], fg=THEMES[CURRENT_THEME]["subtext"]).grid(row=i, column=0, sticky="w", padx=(0,6), pady=2)
-        tk.Label(info_frame, text=v, anchor="w", font=("Helvetica", 9), bg=THEMES[CURRENT_THEME]["card"], fg=THEMES[CURRENT_THEME]["fg"]).grid(row=i, column=1, sticky="w", pady=2)
+    coursework, total, percentage, grade = s.metrics()
+    detail_title.configure(text=s.name)
+    detail_sub.configure(text=f"Student ID: {s.id}")
+    values = (f"{s.c1}, {s.c2}, {s.c3}", str(coursework), str(s.exam), str(total), f"{percentage:.2f}%", grade)
+    for label, v in zip(detail_values, values):
+        label.configure(text=v)
+
+STATS_FIELDS = ("Students", "Mean", "Median", "Coursework avg", "Exam avg", "Highest", "Lowest", "Grades")
+stats_values = []  # value labels, in STATS_FIELDS order
+
+def build_stats_card():
+    themed(ttk.Label(stats_card, text="Class Statistics"), "CardTitle.TLabel").pack(anchor="w", padx=12, pady=(10,6))
+    info = themed(ttk.Frame(stats_card), "Card.TFrame")
+    info.pack(fill="both", expand=True, padx=10, pady=(0,6))
+    for i, k in enumerate(STATS_FIELDS):
+        themed(ttk.Label(info, text=k + ":", anchor="w"), "CardKey.TLabel").grid(row=i, column=0, sticky="w", padx=(0,6), pady=2)
+        value = themed(ttk.Label(info, anchor="w"), "CardValue.TLabel")
+        value.grid(row=i, column=1, sticky="w", pady=2)
+        stats_values.append(value)
+
+def show_stats():
+    # cheap: roster_stats is patched by the edits, not rebuilt
+    summary = roster_stats.summary(student_data)
+    if not summary["count"]:
+        values = ("0",) + ("–",) * (len(STATS_FIELDS) - 1)
+    else:
+        top = roster_stats.extreme(student_data, True)
+        low = roster_stats.extreme(student_data, False)
+        values = (
+            str(summary["count"]),
+            f"{summary['mean_percentage']:.2f}%",
+            f"{summary['median_percentage']:.2f}%",
+            f"{summary['mean_coursework']:.1f}",
+            f"{summary['mean_exam']:.1f}",
+            f"{top.name} ({top.percentage:.2f}%)",
+            f"{low.name} ({low.percentage:.2f}%)",
+            "  ".join(f"{g} {n}" for g, n in summary["grades"].items()),
+        )
+    for label, v in zip(stats_values, values):
+        label.configure(text=v)
+
+# -----------------------
+# Background loading
+# -----------------------
+# A worker thread streams the backend's changes and hands batches to the UI
+# over a queue that poll_load drains with root.after (Tk must only be
+# touched from the main thread). The first small batch fills the first
+# screen; Esc or File > Cancel Load stops the worker.
+LOAD_FIRST_BATCH = 200
+LOAD_BATCH = 5000
+LOAD_POLL_MS = 30
+
+load_cancel = None      # threading.Event of the running load
+roster_complete = True  # False while loading or after a cancelled load
+
+def start_background_load():
+    # stream the roster in from backend (a file, or a RosterIngest of many)
+    global student_data, load_cancel, roster_complete, selected_id
+    if load_cancel is not None:
+        load_cancel.set()
+    if isinstance(backend, BinaryBackend):
+        load_cancel = None
+        open_mapped_roster()
+        return
+    student_data = Roster()
+    roster_complete = False
+    selected_id = None
+    history.clear()
+    update_history_menu()
+    unsaved.clear()
+    watcher.sync()  # the load reads the files as they are now
+    populate_tree()
+    show_detail(None)
+    load_cancel = threading.Event()
+    results = queue.Queue()
+    threading.Thread(target=load_worker, args=(backend, results, load_cancel), daemon=True).start()
+    root.after(LOAD_POLL_MS, poll_load, backend, results, load_cancel)
+
+def open_mapped_roster():
+    # .srb rosters are memory-mapped rather than streamed; opening takes the
+    # same time at any size and records are decoded as they are shown
+    global student_data, roster_complete, selected_id
+    try:
+        student_data = backend.roster()
+    except Exception as e:
+        messagebox.showerror("File Error", f"Could not read {backend.path}:\n{e}")
+        student_data = Roster()
+    roster_complete = True
+    selected_id = None
+    history.clear()
+    update_history_menu()
+    unsaved.clear()
+    watcher.sync()  # the load reads the files as they are now
+    populate_tree()
+    warn_marks_over()
+    show_detail(None)
+    set_status(f"Opened {len(student_data)} students from {backend.path}.")
+
+def edit_roster():
+    # a mapped roster is read-only: copy it into a Roster before the first edit
+    global student_data
+    if isinstance(student_data, MappedRoster):
+        set_status(f"Copying {len(student_data)} students for editing…")
+        root.update_idletasks()
+        student_data = Roster(student_data)
+        populate_tree()
+
+def load_worker(source, results, cancel):
+    fraction = 0.0
+
+    def progress(value):
+        nonlocal fraction
+        fraction = value
+
+    try:
+        batch = []
+        limit = LOAD_FIRST_BATCH
+        with profiler.span("load (read)"):
+            for change in source.iter_changes(progress):
+                batch.append(change)
+                if len(batch) >= limit:
+                    results.put(("batch", batch, fraction))
+                    batch, limit = [], LOAD_BATCH
+                    if cancel.is_set():
+                        results.put(("cancelled",))
+                        return
+        results.put(("batch", batch, 1.0))
+        results.put(("done",))
+    except Exception as e:
+        results.put(("error", e))
+
+def poll_load(source, results, cancel):
+    global roster_complete
+    if cancel is not load_cancel:
+        return  # superseded by a newer load
+    filename = source.path
+    while True:
+        try:
+            msg = results.get_nowait()
+        except queue.Empty:
+            break
+        if msg[0] == "batch":
+            fresh = []
+            with profiler.span("load (batch)"):
+                for op, value in msg[1]:
+                    if op == "put":
+                        if value.id not in student_data:
+                            fresh.append(value)
+                        student_data.put(value)
+                    elif value in student_data:
+                        view_remove(student_data.get(value))
+                        apply_change(student_data, (op, value))
+                view_extend(fresh)
+            set_status(f"Loading {filename}… {msg[2]:.0%} ({len(student_data)} students). Press Esc to cancel.")
+        elif msg[0] == "done":
+            roster_complete = True
+            populate_tree()
+            set_status(f"Loaded {len(student_data)} students from {filename}.")
+            if isinstance(source, RosterIngest):
+                show_ingest_report(source)
+            warn_marks_over()
+            if source is backend:
+                restore_journal(backend.journal_conflict())
+            return
+        elif msg[0] == "cancelled":
+            populate_tree()
+            set_status(f"Load cancelled after {len(student_data)} students; reload before saving.")
+            return
+        else:
+            populate_tree()
+            messagebox.showerror("File Error", f"Could not read {filename}:\n{msg[1]}")
+            return
+    root.after(LOAD_POLL_MS, poll_load, source, results, cancel)
+
+def cancel_load_action(event=None):
+    # Esc: stops a running load, or else a running report
+    if load_cancel is not None and not roster_complete:
+        load_cancel.set()
+        set_status("Cancelling load…")
+    elif report_cancel is not None:
+        report_cancel.set()
+        set_status("Cancelling reports…")
 
 # -----------------------
 # Actions
 # -----------------------
 def view_all_action():
+    if search_query:
+        search_var.set("")  # clears the filter through on_search_change
     populate_tree()
     set_status("Viewing all students.")
 
+# -----------------------
+# Live search
+# -----------------------
+search_query = ""  # stripped, lowercased text of the search box
+
+def on_search_change(*args):
+    global search_query
+    q = search_var.get().strip().lower()
+    if q == search_query:
+        return
+    narrow = search_query and q.startswith(search_query) and not q.isdigit()
+    search_query = q
+    if narrow:
+        # an extended query only ever drops rows from the current results:
+        # keep those the index still finds, without re-matching any names
+        ids = name_index.search(student_data, q)
+        populate_tree([s for s in view_rows if s.id in ids])
+    else:
+        populate_tree()
+
+def on_search_enter(event=None):
+    if view_rows:
+        reveal_student(view_rows[0])
+        show_detail(view_rows[0])
+
+def clear_search(event=None):
+    search_var.set("")
+    return "break"
+
 def find_student_action():
-    q = simpledialog.askstring("Find Student", "Enter student name or ID:")
-    if not q:
-        return
-    ql = q.lower()
-    found = []
-    for s in student_data:
-        if ql in s["name"].lower() or q == str(s["id"]):
-            found.append(s)
-    if not found:
-        messagebox.showinfo("Not found", "No matching student found.")
-        return
-    # show first match and select it
-    populate_tree()
-    for s in found:
-        tree.selection_set(str(s["id"]))
-        tree.focus(str(s["id"]))
-        tree.see(str(s["id"]))
-        show_detail(s)
-        break
-    set_status(f"Found {len(found)} match(es).")
+    search_entry.focus_set()
+    search_entry.select_range(0, "end")
+    set_status("Type a name or ID to filter; Enter selects the first match.")
 
 def add_student_action():
     AddOrUpdateDialog(root, title="Add Student", callback=add_student_callback)
 
 def add_student_callback(data):
     # data: dict with id,name,c1,c2,c3,exam
-    if any(str(data['id']) == str(s['id']) for s in student_data):
+    if data['id'] in student_data:
         messagebox.showerror("Duplicate ID", "A student with that ID already exists.")
         return
-    coursework, total, percentage, grade = calc_metrics(data['c1'], data['c2'], data['c3'], data['exam'])
-    s = {
-        "id": data['id'], "name": data['name'],
-        "c1": data['c1'], "c2": data['c2'], "c3": data['c3'], "exam": data['exam'],
-        "coursework": coursework, "total": total,
-        "percentage": percentage, "grade": grade
-    }
+    edit_roster()
+    s = Student(data['id'], data['name'], data['c1'], data['c2'], data['c3'], data['exam'])
     student_data.append(s)
-    save_student_data()
-    populate_tree()
+    notify_added(s)
+    mark_unsaved(s.id, None)
+    persist_change(s)
+    history.record(edit_step(s, None), f"Add {s.name}")
+    update_history_menu()
+    view_insert(s)
     set_status(f"Added student {s['name']} (ID {s['id']}).")
 
 def delete_student_action():
+    global selected_id
+    flush_display()  # the selection is read back from the tree
     sel = tree.selection()
     if not sel:
         messagebox.showinfo("Select", "Please select a student to delete.")
         return
     sid = int(sel[0])
-    s = next((x for x in student_data if x["id"] == sid), None)
+    s = student_data.get(sid)
     if not s:
         messagebox.showerror("Error", "Selected student not found.")
         return
     if not messagebox.askyesno("Confirm Delete", f"Delete {s['name']} (ID {s['id']})?"):
         return
+    edit_roster()
     student_data.remove(s)
-    save_student_data()
-    populate_tree()
+    notify_removed(s)
+    selected_id = None
+    mark_unsaved(s.id, student_values(s))
+    persist_change(s, deleted=True)
+    history.record(("delete", student_values(s)), f"Delete {s.name}")
+    update_history_menu()
+    view_remove(s)
     show_detail(None)
     set_status(f"Deleted student ID {sid}.")
 
 def update_student_action():
+    flush_display()  # the selection is read back from the tree
     sel = tree.selection()
     if not sel:
         messagebox.showinfo("Select", "Please select a student to update.")
         return
     sid = int(sel[0])
-    s = next((x for x in student_data if x["id"] == sid), None)
+    s = student_data.get(sid)
     if not s:
         messagebox.showerror("Error", "Selected student not found.")
         return
     AddOrUpdateDialog(root, title="Update Student", initial=s.copy(), callback=lambda d: update_student_callback(s, d))
 
 def update_student_callback(orig, data):
-    # update orig dict in-place
+    # update orig record in-place
+    edit_roster()
+    old = orig.copy()
     orig["name"] = data["name"]
     orig["c1"] = data["c1"]
     orig["c2"] = data["c2"]
     orig["c3"] = data["c3"]
     orig["exam"] = data["exam"]
-    coursework, total, percentage, grade = calc_metrics(orig["c1"], orig["c2"], orig["c3"], orig["exam"])
-    orig["coursework"] = coursework
-    orig["total"] = total
-    orig["percentage"] = percentage
-    orig["grade"] = grade
-    save_student_data()
-    populate_tree()
-    tree.selection_set(str(orig["id"]))
+    # coursework/total/percentage/grade follow from the marks
+    student_data.put(orig)  # same position; bumps the roster version
+    notify_updated(orig, old)
+    mark_unsaved(orig.id, copy_values(old))
+    persist_change(orig)
+    history.record(edit_step(orig, old), f"Update {orig.name}")
+    update_history_menu()
+    view_update(orig)
+    reveal_student(orig)
     show_detail(orig)
     set_status(f"Updated student ID {orig['id']}.")
 
+# -----------------------
+# Undo / redo
+# -----------------------
+# history holds compact inverse records (student_core.EditHistory), never
+# copies of the roster. A single-student step is patched into the indexes
+# and the table like any edit; a bulk step refreshes the table once. Either
+# way the step is one write.
+history = EditHistory()
+PATCH_MAX = 200  # changes patched in row by row; more refresh the table once
+
+def undo_action(event=None):
+    if typing_in(event):
+        return None
+    step_history(history.undo, "Undid", "Nothing to undo.")
+    return "break"
+
+def redo_action(event=None):
+    if typing_in(event):
+        return None
+    step_history(history.redo, "Redid", "Nothing to redo.")
+    return "break"
+
+def typing_in(event):
+    # the shortcuts are bound on root, so they also reach the search entry:
+    # a keystroke there is text editing, not a roster undo
+    return event is not None and isinstance(event.widget, (tk.Entry, ttk.Entry))
+
+def step_history(step, verb, nothing):
+    if not roster_complete:
+        set_status("Wait for the roster to finish loading.")
+        return
+    edit_roster()
+    label, effects = step(student_data)
+    update_history_menu()
+    if label is None:
+        set_status(nothing)
+        return
+    show_effects(effects)
+    if len(effects) == 1 and effects[0][0] != "removed":
+        reveal_student(effects[0][1])
+        show_detail(effects[0][1])
+    for kind, s, old in effects:
+        mark_unsaved(s.id, None if kind == "added" else copy_values(old) if old else student_values(s))
+    persist_many([("delete", s.id) if kind == "removed" else ("put", s) for kind, s, old in effects])
+    set_status(f"{verb}: {label}.")
+
+def show_effects(effects):
+    # effects from apply_step: patched into the indexes and the table one
+    # by one when few, else one refresh (the indexes see the version jump)
+    global selected_id
+    if len(effects) > PATCH_MAX:
+        populate_tree()
+    else:
+        for kind, s, old in effects:
+            if kind == "added":
+                notify_added(s)
+                view_insert(s)
+            elif kind == "removed":
+                notify_removed(s)
+                view_remove(s)
+            else:
+                notify_updated(s, old)
+                view_update(s)
+    if selected_id is not None and selected_id not in student_data:
+        selected_id = None
+    mark_dirty("detail")
+
+def update_history_menu():
+    undo, redo = history.undo_label(), history.redo_label()
+    editmenu.entryconfigure(0, label=f"Undo {undo}" if undo else "Undo", state="normal" if undo else "disabled")
+    editmenu.entryconfigure(1, label=f"Redo {redo}" if redo else "Redo", state="normal" if redo else "disabled")
+
+# -----------------------
+# Outside changes
+# -----------------------
+# Other tools may rewrite the roster file while it is open. poll_watcher
+# checks the backend's files every WATCH_POLL_MS (a stat, see FileWatcher);
+# when they change, a worker reads the file and reconcile() diffs it
+# against student_data by ID. Only the added, removed and changed rows are
+# applied, through show_effects, so the sort and the selection stay put.
+# Rows also edited here and not yet written are conflicts: the user keeps
+# theirs or takes the file's.
+WATCH_POLL_MS = 1000
+CONFLICT_LINES = 10
+
+watch_results = queue.Queue()
+watch_reading = False  # a read (or its conflict prompt) is in progress
+watch_writes = 0       # watcher.writes when the read started
+watch_again = False    # a read was dropped: read again even if nothing changed since
+
+def poll_watcher():
+    global watch_reading, watch_writes, watch_again
+    root.after(WATCH_POLL_MS, poll_watcher)
+    if watch_reading or not roster_complete or writer.pending or not (watch_again or watcher.changed()):
+        return
+    watch_reading = True
+    watch_again = False
+    watch_writes = watcher.writes
+    watcher.sync()  # anything written while we read is caught next time
+    threading.Thread(target=watch_worker, args=(backend, watch_results), daemon=True).start()
+    root.after(LOAD_POLL_MS, poll_watch_read)
+
+def watch_worker(source, results):
+    try:
+        if not os.path.exists(source.path):
+            results.put((source, None, None, None))  # being replaced; wait for the new file
+            return
+        results.put((source, read_roster_values(source), source.journal_conflict(), None))
+    except Exception as e:
+        results.put((source, None, None, e))
+
+def poll_watch_read():
+    global watch_reading, watch_again
+    try:
+        source, fresh, journal, error = watch_results.get_nowait()
+    except queue.Empty:
+        root.after(LOAD_POLL_MS, poll_watch_read)
+        return
+    try:
+        if source is not backend or not roster_complete or fresh is None or watcher.changed():
+            # superseded, missing or still being written: the next poll reads it again
+            if error is not None:
+                set_status(f"{os.path.basename(source.path)} changed on disk but could not be read: {error}")
+            return
+        if watcher.writes != watch_writes:
+            # we wrote while it was read, so fresh may predate our edits, and
+            # the baseline has moved past the change that started the read
+            watch_again = True
+            return
+        apply_outside_changes(fresh, journal)
+        if journal:
+            writer.save_all(student_data)  # settled: a new snapshot replaces the stale journal
+            watch_writer()
+    finally:
+        watch_reading = False
+
+def apply_outside_changes(fresh, journal=None):
+    # journal: edits the replaced file's journal held (see journal_conflict).
+    # They never reached the new file, so they count as unsaved edits whose
+    # baseline is unknown: any row the file has differently is a conflict.
+    pending = unsaved
+    if journal:
+        pending = dict(unsaved)
+        for sid in replay_values(journal):
+            pending.setdefault(sid, object())
+    step, conflicts = reconcile(student_data, fresh, pending)
+    taken = []
+    if conflicts and not keep_ours(conflicts):
+        taken = conflicts
+        step = ("bulk", step[1] + tuple(filter(None, (step_to(student_data.get(sid), theirs)
+                                                      for sid, ours, theirs in conflicts))))
+    name = os.path.basename(backend.path)
+    if not step[1]:
+        if conflicts:
+            set_status(f"{name} changed on disk; kept your {len(conflicts)} conflicting edits.")
+        return
+    edit_roster()
+    effects = apply_step(student_data, step)
+    show_effects(effects)
+    if taken and not journal:  # journal: the save_all that follows writes them
+        # our queued writes would put our version back: write theirs after them
+        for sid, ours, theirs in taken:
+            unsaved[sid] = theirs
+        persist_many([("put", student_data.get(sid)) if theirs else ("delete", sid) for sid, ours, theirs in taken])
+    counts = {kind: 0 for kind in ("added", "updated", "removed")}
+    for kind, s, old in effects:
+        counts[kind] += 1
+    set_status(f"{name} changed on disk: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()) + ".")
+
+def restore_journal(journal):
+    # the file was replaced while this program was closed, and its journal
+    # holds edits the new file lacks: offer them back, then settle it with a
+    # fresh snapshot either way
+    if not journal:
+        return
+    conflicts = []
+    for sid, ours in replay_values(journal).items():
+        s = student_data.get(sid)
+        theirs = student_values(s) if s is not None else None
+        if ours != theirs:
+            conflicts.append((sid, ours, theirs))
+    if conflicts and keep_ours(conflicts):
+        edit_roster()
+        effects = apply_step(student_data, ("bulk", tuple(filter(None, (step_to(student_data.get(sid), ours)
+                                                                          for sid, ours, theirs in conflicts)))))
+        show_effects(effects)
+        set_status(f"Restored {len(conflicts)} journaled edits to {os.path.basename(backend.path)}.")
+    writer.save_all(student_data)
+    watch_writer()
+
+def keep_ours(conflicts):
+    # True: keep the local edits; False: take the file's version of those rows
+    def describe(values):
+        return "deleted" if values is None else f"{values[1]} {values[2]}/{values[3]}/{values[4]}/{values[5]}"
+    lines = [f"  ID {sid}: here {describe(ours)}, file {describe(theirs)}" for sid, ours, theirs in conflicts[:CONFLICT_LINES]]
+    if len(conflicts) > CONFLICT_LINES:
+        lines.append(f"  …and {len(conflicts) - CONFLICT_LINES} more.")
+    return messagebox.askyesno(
+        "Conflicting Changes",
+        f"{os.path.basename(backend.path)} was changed by another program, and {len(conflicts)} of the "
+        "students it changed also have edits here that are not in the file:\n\n" + "\n".join(lines) +
+        "\n\nKeep your edits? (No takes the file's version.)")
+
+MARK_LABELS = dict(zip(MARK_FIELDS, ("Coursework 1", "Coursework 2", "Coursework 3", "Exam Mark")))
+BULK_ERROR_LINES = 15
+
+def bulk_import_action():
+    BulkImportDialog(root, callback=lambda records: apply_bulk_records(records, "Bulk import"))
+
+def adjust_marks_action():
+    if not student_data:
+        messagebox.showinfo("No Data", "No students loaded.")
+        return
+    AdjustMarksDialog(root, shown=len(view_rows), total=len(student_data), callback=adjust_marks_callback)
+
+def adjust_marks_callback(field, delta, everyone):
+    records = adjust_marks(student_data if everyone else view_rows, field, delta)
+    apply_bulk_records(records, f"{MARK_LABELS[field]} {delta:+d}")
+
+def apply_bulk_records(records, what):
+    # any number of rows: one roster change, one write, one table refresh.
+    # The per-edit notify_* hooks are skipped; the sort cache, name index
+    # and statistics see the version jump and rebuild once when next read.
+    edit_roster()
+    changes = apply_bulk(student_data, records)
+    if not changes:
+        set_status(f"{what}: nothing changed.")
+        return
+    populate_tree()
+    mark_dirty("detail")
+    added = sum(1 for s, old in changes if old is None)
+    set_status(f"{what}: {added} added, {len(changes) - added} updated.")
+    for s, old in changes:
+        mark_unsaved(s.id, copy_values(old) if old else None)
+    persist_many([("put", s) for s, old in changes])
+    if not history.record(("bulk", tuple(filter(None, (edit_step(s, old) for s, old in changes)))), what):
+        set_status(f"{what}: {added} added, {len(changes) - added} updated. Too many rows to undo; "
+                   "the undo history was cleared.")
+    update_history_menu()
+
 def sort_records_action():
+    global view_sort
     # Provide a simple sort dialog (choice)
     choices = [
         "Name (A → Z)", "Name (Z → A)",
@@ -318,31 +1315,34 @@ def sort_records_action():
     if not choice:
         return
     if "Name (A" in choice:
-        student_data.sort(key=lambda x: x["name"].lower())
+        order = ("name", False, False)
     elif "Name (Z" in choice:
-        student_data.sort(key=lambda x: x["name"].lower(), reverse=True)
+        order = ("name", False, True)
     elif "High" in choice:
-        student_data.sort(key=lambda x: x["percentage"], reverse=True)
+        order = ("percentage", True, True)
     elif "Low" in choice:
-        student_data.sort(key=lambda x: x["percentage"])
+        order = ("percentage", True, False)
     elif "ID (Ascending" in choice:
-        student_data.sort(key=lambda x: x["id"])
+        order = ("id", True, False)
     elif "Descending" in choice:
-        student_data.sort(key=lambda x: x["id"], reverse=True)
+        order = ("id", True, True)
     else:
         messagebox.showinfo("Sort", "Unknown choice.")
         return
-    populate_tree()
+    view_sort = order
+    with profiler.span("sort_records"):
+        edit_roster()
+        student_data.reorder(sorted_rows(*order))
+        sort_cache.reordered(student_data)
+        populate_tree()
     set_status(f"Sorted by: {choice}")
 
 def highest_action():
     if not student_data:
         messagebox.showinfo("No Data", "No students loaded.")
         return
-    top = max(student_data, key=lambda s: s["total"])
-    tree.selection_set(str(top["id"]))
-    tree.focus(str(top["id"]))
-    tree.see(str(top["id"]))
+    top = roster_stats.extreme(student_data, True)
+    reveal_student(top)
     show_detail(top)
     set_status(f"Highest scoring: {top['name']} ({top['percentage']:.2f}%).")
 
@@ -350,36 +1350,277 @@ def lowest_action():
     if not student_data:
         messagebox.showinfo("No Data", "No students loaded.")
         return
-    low = min(student_data, key=lambda s: s["total"])
-    tree.selection_set(str(low["id"]))
-    tree.focus(str(low["id"]))
-    tree.see(str(low["id"]))
+    low = roster_stats.extreme(student_data, False)
+    reveal_student(low)
     show_detail(low)
     set_status(f"Lowest scoring: {low['name']} ({low['percentage']:.2f}%).")
 
+def grade_distribution_action():
+    if not student_data:
+        messagebox.showinfo("No Data", "No students loaded.")
+        return
+    counts = roster_stats.summary(student_data)["grades"]
+    lines = [f"{g}: {n} ({n / len(student_data):.1%})" for g, n in counts.items()]
+    messagebox.showinfo("Grade Distribution", f"Scheme: {grading_scheme().name}\n\n" + "\n".join(lines))
+
 def reload_action():
-    global student_data
-    student_data = load_student_data()
-    populate_tree()
-    show_detail(None)
-    set_status("Reloaded from file.")
+    writer.flush()  # read back what we have written
+    start_background_load()
+
+ROSTER_FILETYPES = [("Student marks", "*.txt"), ("SQLite roster", "*.db *.sqlite *.sqlite3"),
+                    ("Binary roster", "*.srb"), ("All files", "*.*")]
+
+def open_roster_action():
+    path = filedialog.askopenfilename(title="Open Roster", filetypes=ROSTER_FILETYPES)
+    if not path:
+        return
+    set_backend(open_backend(path))
+    start_background_load()
+
+INGEST_REPORT_LINES = 15
+
+def import_folder_action():
+    # merge every marks file in a folder, parsed in-process: spawned workers
+    # would re-run this script and open windows of their own, and forking
+    # from the loader thread can deadlock on locks other threads hold
+    path = filedialog.askdirectory(title="Import Folder of Marks Files")
+    if not path:
+        return
+    set_backend(RosterIngest(path, workers=1))
+    start_background_load()
+
+def show_ingest_report(source):
+    # one summary dialog for the whole import instead of a popup per file
+    set_status(f"Imported {len(student_data)} students from {source.files} files. Use Save As to keep them.")
+    lines = []
+    if source.collisions:
+        lines.append(f"{len(source.collisions)} duplicate IDs; the first file's student was kept:")
+        lines += [f"  ID {sid}: {os.path.basename(path)} (already in {os.path.basename(first)})"
+                  for sid, first, path in source.collisions[:INGEST_REPORT_LINES]]
+    if source.errors:
+        lines.append(f"{len(source.errors)} files could not be read:")
+        lines += [f"  {os.path.basename(path)}: {error}" for path, error in source.errors[:INGEST_REPORT_LINES]]
+    if lines:
+        messagebox.showwarning("Import", "\n".join(lines))
+
+def save_as_action():
+    if not roster_complete:
+        messagebox.showerror("Save Error", "The roster is only partly loaded. Reload the file before saving.")
+        return
+    path = filedialog.asksaveasfilename(title="Save Roster As", filetypes=ROSTER_FILETYPES, defaultextension=".txt")
+    if not path:
+        return
+    set_backend(open_backend(path))
+    writer.save_all(student_data)
+    watch_writer()
+    set_status(f"Saving {len(student_data)} students to {path}…")
 
 def toggle_theme():
-    apply_theme("warm" if CURRENT_THEME == "dark" else "dark")
+    global theme_wanted
+    theme_wanted = "warm" if (theme_wanted or CURRENT_THEME) == "dark" else "dark"
+    mark_dirty("theme")
 
 # -----------------------
-# Dialog for Add / Update
+# Grading schemes
 # -----------------------
-class AddOrUpdateDialog(tk.Toplevel):
-    def __init__(self, parent, title="Add / Update", initial=None, callback=None):
+# The schemes come from GRADING_FILE (see student_core). Switching scheme
+# regrades the roster in one batch; only the rows whose percentage or
+# grade changed are patched into the table, unless there are many or the
+# table is ordered by them, which refreshes it once.
+grading_schemes = {}
+
+def load_grading_config():
+    global grading_schemes
+    try:
+        grading_schemes, default = load_grading_schemes()
+    except (OSError, ValueError) as e:
+        grading_schemes, default = {STANDARD_SCHEME.name: STANDARD_SCHEME}, STANDARD_SCHEME.name
+        messagebox.showerror("Grading Error", f"Could not read {GRADING_FILE}; using the standard scheme.\n{e}")
+    use_grading_scheme(grading_schemes[default])
+
+def describe_scheme(scheme):
+    if scheme.weights is None:
+        weighting = f"marks out of {scheme.total_max}"
+    else:
+        weighting = f"coursework {scheme.weights['coursework']:g}%, exam {scheme.weights['exam']:g}%"
+    bounds = ", ".join(f"{g} ≥ {lowest:g}%" for g, lowest in scheme.boundaries[:-1])
+    return f"{weighting}; {bounds}, else {scheme.grades[-1]}" if bounds else weighting
+
+def grading_scheme_action():
+    if not roster_complete:
+        set_status("Wait for the roster to finish loading.")
+        return
+    GradingSchemeDialog(root, grading_schemes, grading_scheme().name, callback=apply_grading_scheme)
+
+def warn_marks_over():
+    # a roster loaded under a scheme with lower maximums than its marks
+    over = marks_over(student_data, grading_scheme())
+    if over:
+        messagebox.showwarning(
+            "Grading Scheme",
+            f"{over} student(s) have marks above the maximums of the {grading_scheme().name} scheme, so their "
+            "percentages exceed 100% and Adjust Marks would cut those marks down.\n\n"
+            "Choose a scheme that fits this roster under Tools → Grading Scheme.")
+
+def apply_grading_scheme(scheme):
+    if scheme is grading_scheme():
+        return
+    try:
+        records, grades_changed = regrade(student_data, scheme)
+    except ValueError as e:
+        messagebox.showerror("Grading Scheme", f"Could not switch to {scheme.name}:\n{e}")
+        return
+    if (len(records) > PATCH_MAX or isinstance(view_rows, MappedRoster)
+            or (view_sort and view_sort[0] in ("percentage", "grade"))):
+        populate_tree()  # a mapped roster is its own view and can't be patched
+    else:
+        for s in records:
+            view_update(s)
+    mark_dirty("stats", "detail")
+    set_status(f"Grading scheme: {scheme.name}. {grades_changed} grade(s) changed.")
+
+# -----------------------
+# Reports
+# -----------------------
+# Transcripts and the class report are rendered by student_reports on a
+# worker thread from a copy of the marks, so edits can carry on meanwhile.
+# No process pool here, for the same reasons as import_folder_action.
+REPORT_POLL_MS = 200
+report_cancel = None  # threading.Event of the running report
+
+def generate_reports_action():
+    global report_cancel
+    if not student_data:
+        messagebox.showinfo("No Data", "No students loaded.")
+        return
+    if report_cancel is not None:
+        set_status("Reports are already being generated. Press Esc to cancel.")
+        return
+    out_dir = filedialog.askdirectory(title="Save Reports In", mustexist=False)
+    if not out_dir:
+        return
+    values = [student_values(s) for s in student_data]
+    report_cancel = threading.Event()
+    results = queue.Queue()
+    threading.Thread(target=report_worker, args=(values, out_dir, results, report_cancel), daemon=True).start()
+    set_status(f"Rendering transcripts for {len(values)} students…")
+    root.after(REPORT_POLL_MS, poll_reports, out_dir, results)
+
+def report_worker(values, out_dir, results, cancel):
+    try:
+        students = Roster(Student(*v) for v in values)
+        summary = generate_reports(students, out_dir, workers=1, progress=lambda f: results.put(("progress", f)),
+                                   cancel=cancel)
+        results.put(("done", summary))
+    except Exception as e:
+        results.put(("error", e))
+
+def poll_reports(out_dir, results):
+    global report_cancel
+    while True:
+        try:
+            msg = results.get_nowait()
+        except queue.Empty:
+            break
+        if msg[0] == "progress":
+            set_status(f"Rendering transcripts… {msg[1]:.0%}. Press Esc to cancel.")
+            continue
+        report_cancel = None
+        if msg[0] == "error":
+            messagebox.showerror("Report Error", f"Could not write the reports to {out_dir}:\n{msg[1]}")
+        elif msg[1]["cancelled"]:
+            set_status(f"Reports cancelled after {msg[1]['rendered']} transcripts.")
+        else:
+            r = msg[1]
+            set_status(f"Reports in {out_dir}: {r['rendered']} transcripts written, {r['skipped']} unchanged, "
+                       f"{r['removed']} removed.")
+        return
+    root.after(REPORT_POLL_MS, poll_reports, out_dir, results)
+
+# -----------------------
+# Performance readout
+# -----------------------
+# Turning the readout on enables student_core.profiler; the status bar then
+# shows the latest timings every PERF_REFRESH_MS. STUDENT_PROFILE=1 in the
+# environment turns it on from startup, so the first load is timed too.
+PERF_REFRESH_MS = 500
+PERF_READOUT_NAMES = 3  # distinct operations shown in the status bar
+PERF_ENV = "STUDENT_PROFILE"
+
+perf_refresh = None  # after() id of the next readout update
+
+def toggle_perf(event=None):
+    global perf_refresh
+    if event is not None:  # the key binding flips the menu's checkbutton too
+        perf_on.set(not perf_on.get())
+    profiler.enabled = perf_on.get()
+    if perf_refresh is not None:
+        root.after_cancel(perf_refresh)
+        perf_refresh = None
+    if profiler.enabled:
+        perf_label.pack(side="right", padx=8, pady=6, before=pending_label)
+        show_perf()
+    else:
+        perf_label.pack_forget()
+
+def show_perf():
+    global perf_refresh
+    shown = {}
+    for name, seconds in profiler.recent(64):
+        if name not in shown:
+            shown[name] = seconds
+            if len(shown) == PERF_READOUT_NAMES:
+                break
+    perf_var.set("  ·  ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in shown.items()) or "Timing on")
+    perf_refresh = root.after(PERF_REFRESH_MS, show_perf)
+
+def timing_report_action():
+    if not profiler.stats():
+        messagebox.showinfo("Timing Report", "Nothing has been timed yet. Turn on View → Performance Readout first.")
+        return
+    TimingReportDialog(root)
+
+def export_trace_action(parent=None):
+    path = filedialog.asksaveasfilename(parent=parent or root, title="Export Trace", defaultextension=".json",
+                                        filetypes=[("Chrome trace", "*.json"), ("All files", "*.*")])
+    if not path:
+        return
+    try:
+        n = profiler.export_trace(path)
+    except OSError as e:
+        messagebox.showerror("Export Error", f"Could not write {path}:\n{e}", parent=parent)
+        return
+    set_status(f"Exported {n} timings to {path}. Open it in chrome://tracing or Perfetto.")
+
+# -----------------------
+# Dialogs
+# -----------------------
+class ThemedDialog(tk.Toplevel):
+    # modal, coloured from the current theme, centred by center()
+    def __init__(self, parent, title):
         super().__init__(parent)
         self.title(title)
         self.resizable(False, False)
-        self.callback = callback
-        self.initial = initial or {}
-        # center window
         self.transient(parent)
         self.grab_set()
+
+    def center(self):
+        self.update_idletasks()
+        w = self.winfo_width()
+        h = self.winfo_height()
+        pw = self.master.winfo_width()
+        ph = self.master.winfo_height()
+        px = self.master.winfo_rootx()
+        py = self.master.winfo_rooty()
+        x = px + (pw - w) // 2
+        y = py + (ph - h) // 2
+        self.geometry(f"+{x}+{y}")
+
+class AddOrUpdateDialog(ThemedDialog):
+    def __init__(self, parent, title="Add / Update", initial=None, callback=None):
+        super().__init__(parent, title)
+        self.callback = callback
+        self.initial = initial or {}
         pad = 10
         self.configure(bg=THEMES[CURRENT_THEME]["panel"])
         frm = tk.Frame(self, bg=THEMES[CURRENT_THEME]["panel"], padx=pad, pady=pad)
@@ -442,18 +1683,6 @@ class AddOrUpdateDialog(tk.Toplevel):
         self.update_idletasks()
         self.center()
 
-    def center(self):
-        self.update_idletasks()
-        w = self.winfo_width()
-        h = self.winfo_height()
-        pw = self.master.winfo_width()
-        ph = self.master.winfo_height()
-        px = self.master.winfo_rootx()
-        py = self.master.winfo_rooty()
-        x = px + (pw - w) // 2
-        y = py + (ph - h) // 2
-        self.geometry(f"+{x}+{y}")
-
     def on_save(self):
         try:
             sid = int(self.ent_id.get()) if self.ent_id.get() else None
@@ -474,19 +1703,186 @@ class AddOrUpdateDialog(tk.Toplevel):
     def cancel(self):
         self.destroy()
 
+class BulkImportDialog(ThemedDialog):
+    # paste CSV rows (or load a file); nothing is applied unless every row is valid
+    def __init__(self, parent, callback=None):
+        super().__init__(parent, "Bulk Import")
+        self.callback = callback
+        pal = THEMES[CURRENT_THEME]
+        self.configure(bg=pal["panel"])
+        frm = tk.Frame(self, bg=pal["panel"], padx=10, pady=10)
+        frm.pack(fill="both", expand=True)
+        tk.Label(frm, text="One student per line: id,name,c1,c2,c3,exam. Existing IDs are updated.",
+                 bg=pal["panel"], fg=pal["fg"]).pack(anchor="w")
+        self.text = tk.Text(frm, width=64, height=16, bg=pal["card"], fg=pal["fg"], insertbackground=pal["fg"])
+        self.text.pack(fill="both", expand=True, pady=8)
+        btn_frame = tk.Frame(frm, bg=pal["panel"])
+        btn_frame.pack(fill="x")
+        tk.Button(btn_frame, text="Load CSV…", command=self.load_file, bg=pal["button_bg"], fg=pal["fg"]).pack(side="left")
+        tk.Button(btn_frame, text="Cancel", command=self.destroy, bg=pal["button_bg"], fg=pal["fg"]).pack(side="right", padx=6)
+        tk.Button(btn_frame, text="Apply", command=self.on_apply, bg=pal["accent"], fg="#fff").pack(side="right", padx=6)
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.center()
+        self.text.focus_set()
+
+    def load_file(self):
+        path = filedialog.askopenfilename(parent=self, title="Import CSV", filetypes=[("CSV", "*.csv *.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("File Error", f"Could not read {path}:\n{e}", parent=self)
+            return
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", content)
+
+    def on_apply(self):
+        records, errors = parse_bulk_rows(self.text.get("1.0", "end"))
+        if errors:
+            lines = [f"Line {n}: {msg}" for n, msg in errors[:BULK_ERROR_LINES]]
+            if len(errors) > BULK_ERROR_LINES:
+                lines.append(f"…and {len(errors) - BULK_ERROR_LINES} more.")
+            messagebox.showerror("Invalid Rows", "Nothing was imported.\n\n" + "\n".join(lines), parent=self)
+            return
+        if not records:
+            messagebox.showinfo("Bulk Import", "There are no rows to import.", parent=self)
+            return
+        self.destroy()
+        if self.callback:
+            self.callback(records)
+
+class AdjustMarksDialog(ThemedDialog):
+    # add (or subtract) points on one mark for the students shown, or everyone
+    def __init__(self, parent, shown, total, callback=None):
+        super().__init__(parent, "Adjust Marks")
+        self.callback = callback
+        pal = THEMES[CURRENT_THEME]
+        self.configure(bg=pal["panel"])
+        frm = tk.Frame(self, bg=pal["panel"], padx=10, pady=10)
+        frm.pack(fill="both", expand=True)
+        tk.Label(frm, text="Mark:", bg=pal["panel"], fg=pal["fg"]).grid(row=0, column=0, sticky="e", padx=(0,8), pady=6)
+        self.field = tk.StringVar(value=MARK_LABELS["exam"])
+        tk.OptionMenu(frm, self.field, *MARK_LABELS.values()).grid(row=0, column=1, sticky="w", pady=6)
+        tk.Label(frm, text="Change by:", bg=pal["panel"], fg=pal["fg"]).grid(row=1, column=0, sticky="e", padx=(0,8), pady=6)
+        self.ent_delta = tk.Entry(frm, width=8)
+        self.ent_delta.grid(row=1, column=1, sticky="w", pady=6)
+        self.everyone = tk.BooleanVar(value=shown == total)
+        for i, (text, value) in enumerate(((f"Students shown ({shown})", False), (f"All students ({total})", True))):
+            tk.Radiobutton(frm, text=text, variable=self.everyone, value=value, bg=pal["panel"], fg=pal["fg"],
+                           selectcolor=pal["card"], activebackground=pal["panel"]).grid(row=2 + i, column=1, sticky="w")
+        tk.Label(frm, text="Marks are kept within their range.", bg=pal["panel"], fg=pal["subtext"]).grid(row=4, column=0, columnspan=2, pady=(6,0))
+        btn_frame = tk.Frame(frm, bg=pal["panel"])
+        btn_frame.grid(row=5, column=0, columnspan=2, pady=(10,0))
+        tk.Button(btn_frame, text="Cancel", command=self.destroy, bg=pal["button_bg"], fg=pal["fg"]).pack(side="right", padx=6)
+        tk.Button(btn_frame, text="Apply", command=self.on_apply, bg=pal["accent"], fg="#fff").pack(side="right", padx=6)
+        self.bind("<Return>", lambda e: self.on_apply())
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.center()
+        self.ent_delta.focus_set()
+
+    def on_apply(self):
+        try:
+            delta = int(self.ent_delta.get())
+        except ValueError:
+            messagebox.showerror("Invalid", "Enter a whole number of marks, e.g. 5 or -3.", parent=self)
+            return
+        field = next(f for f, label in MARK_LABELS.items() if label == self.field.get())
+        self.destroy()
+        if self.callback and delta:
+            self.callback(field, delta, self.everyone.get())
+
+class GradingSchemeDialog(ThemedDialog):
+    # pick the scheme every percentage and grade is worked out with
+    def __init__(self, parent, schemes, current, callback=None):
+        super().__init__(parent, "Grading Scheme")
+        self.schemes = schemes
+        self.callback = callback
+        pal = THEMES[CURRENT_THEME]
+        self.configure(bg=pal["panel"])
+        frm = tk.Frame(self, bg=pal["panel"], padx=10, pady=10)
+        frm.pack(fill="both", expand=True)
+        self.choice = tk.StringVar(value=current)
+        row = 0
+        for name, scheme in schemes.items():
+            tk.Radiobutton(frm, text=name, variable=self.choice, value=name, bg=pal["panel"], fg=pal["fg"],
+                           selectcolor=pal["card"], activebackground=pal["panel"]).grid(row=row, column=0, sticky="w")
+            tk.Label(frm, text=describe_scheme(scheme), bg=pal["panel"], fg=pal["subtext"]).grid(row=row + 1, column=0, sticky="w", padx=(24,0), pady=(0,6))
+            row += 2
+        tk.Label(frm, text=f"Schemes are read from {GRADING_FILE}.", bg=pal["panel"], fg=pal["subtext"]).grid(row=row, column=0, pady=(6,0))
+        btn_frame = tk.Frame(frm, bg=pal["panel"])
+        btn_frame.grid(row=row + 1, column=0, pady=(10,0))
+        tk.Button(btn_frame, text="Cancel", command=self.destroy, bg=pal["button_bg"], fg=pal["fg"]).pack(side="right", padx=6)
+        tk.Button(btn_frame, text="Apply", command=self.on_apply, bg=pal["accent"], fg="#fff").pack(side="right", padx=6)
+        self.bind("<Return>", lambda e: self.on_apply())
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.center()
+
+    def on_apply(self):
+        scheme = self.schemes[self.choice.get()]
+        self.destroy()
+        if self.callback:
+            self.callback(scheme)
+
+class TimingReportDialog(ThemedDialog):
+    # per-operation counts, times and a histogram of every call this session
+    BAR = 30  # characters for the most common bucket
+
+    def __init__(self, parent):
+        super().__init__(parent, "Timing Report")
+        pal = THEMES[CURRENT_THEME]
+        self.configure(bg=pal["panel"])
+        frm = tk.Frame(self, bg=pal["panel"], padx=10, pady=10)
+        frm.pack(fill="both", expand=True)
+        self.text = tk.Text(frm, width=78, height=26, bg=pal["card"], fg=pal["fg"], font=("Courier", 9), wrap="none")
+        self.text.pack(fill="both", expand=True, pady=(0,8))
+        btn_frame = tk.Frame(frm, bg=pal["panel"])
+        btn_frame.pack(fill="x")
+        tk.Button(btn_frame, text="Reset", command=self.reset, bg=pal["button_bg"], fg=pal["fg"]).pack(side="left")
+        tk.Button(btn_frame, text="Export Trace…", command=lambda: export_trace_action(self),
+                  bg=pal["button_bg"], fg=pal["fg"]).pack(side="left", padx=6)
+        tk.Button(btn_frame, text="Close", command=self.destroy, bg=pal["accent"], fg="#fff").pack(side="right")
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.fill()
+        self.center()
+
+    def fill(self):
+        lines = [f"{'Operation':<24}{'Calls':>7}{'Mean':>10}{'p50':>10}{'p95':>10}{'Max':>10}  (ms; p50/p95 of recent calls)"]
+        stats = profiler.stats()
+        for name, st in stats.items():
+            lines.append(f"{name:<24}{st['count']:>7}" + "".join(f"{st[k] * 1000:>10.2f}" for k in ("mean", "p50", "p95", "max")))
+        for name in stats:
+            buckets = [(upper, n) for upper, n in profiler.histogram(name) if n]
+            most = max(n for upper, n in buckets)
+            lines += ["", name]
+            for upper, n in buckets:
+                label = f"≤ {upper:g} ms" if upper is not None else "slower"
+                lines.append(f"  {label:>11} {n:>6}  {'█' * max(1, n * self.BAR // most)}")
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state="disabled")
+
+    def reset(self):
+        profiler.reset()
+        self.fill()
+
 # -----------------------
 # Column sorting by header click
 # -----------------------
 _sort_reverse = {}
+@profiler.timed("treeview_sort_column")
 def treeview_sort_column(tv, col, numeric=False):
-    global _sort_reverse
-    items = [(tv.set(k, col), k) for k in tv.get_children('')]
-    if numeric:
-        items.sort(key=lambda t: float(t[0]) if t[0] != '' else 0, reverse=_sort_reverse.get(col, False))
+    global _sort_reverse, view_sort, view_rows
+    view_sort = (COL_KEYS[col], numeric, _sort_reverse.get(col, False))
+    view_rows = search_filter(sorted_rows(*view_sort))
+    if sync_view_mode() or virtual_mode or "table" in dirty_regions:
+        # only the visible window is in the widget, or it is rebuilt anyway
+        mark_dirty("table")
     else:
-        items.sort(key=lambda t: t[0].lower() if isinstance(t[0], str) else t[0], reverse=_sort_reverse.get(col, False))
-    for index, (val, k) in enumerate(items):
-        tv.move(k, '', index)
+        # reorder every item in one Tk call
+        tv.set_children('', *[str(s.id) for s in view_rows])
     _sort_reverse[col] = not _sort_reverse.get(col, False)
 
 # -----------------------
@@ -502,97 +1898,93 @@ style = ttk.Style(root)
 default_font = ("Helvetica", 10)
 
 CURRENT_THEME = "dark"
-student_data = load_student_data()
-
-# Background image (only used in dark theme optionally)
-bg_photo_img = None
-bg_label = None
-try:
-    if os.path.exists("classroom.png"):
-        im = Image.open("classroom.png")
-        im = im.resize((1200, 800))
-        bg_photo_img = ImageTk.PhotoImage(im)
-    else:
-        bg_photo_img = None
-except Exception:
-    bg_photo_img = None
+build_styles()
+student_data = Roster()
+backend = None
 
 # main frame
-main_frame = tk.Frame(root, bg=THEMES[CURRENT_THEME]["bg"])
+main_frame = themed(ttk.Frame(root), "Bg.TFrame")
 main_frame.pack(fill="both", expand=True)
 
 # header
-header_frame = tk.Frame(main_frame, bg=THEMES[CURRENT_THEME]["bg"])
+header_frame = themed(ttk.Frame(main_frame), "Bg.TFrame")
 header_frame.pack(fill="x", padx=12, pady=(12,6))
-header_label = tk.Label(header_frame, text="Student Manager", font=("Segoe UI", 18, "bold"), bg=THEMES[CURRENT_THEME]["bg"], fg=THEMES[CURRENT_THEME]["fg"])
+header_label = themed(ttk.Label(header_frame, text="Student Manager"), "Header.TLabel")
 header_label.pack(side="left", padx=(6,10))
 
 # theme toggle button
-theme_toggle_btn = tk.Button(header_frame, text="Toggle Theme", command=toggle_theme, bd=0)
+theme_toggle_btn = themed(ttk.Button(header_frame, text="Toggle Theme", command=toggle_theme), "Side.TButton")
 theme_toggle_btn.pack(side="right", padx=6)
 
 # layout: left controls, right table + detail
-content_frame = tk.Frame(main_frame, bg=THEMES[CURRENT_THEME]["bg"])
+content_frame = themed(ttk.Frame(main_frame), "Bg.TFrame")
 content_frame.pack(fill="both", expand=True, padx=12, pady=6)
 
-left_panel = tk.Frame(content_frame, width=260, bg=THEMES[CURRENT_THEME]["panel"], relief="flat")
+left_panel = themed(ttk.Frame(content_frame, width=260), "Panel.TFrame")
 left_panel.pack(side="left", fill="y", padx=(0,10), pady=6)
 left_panel.pack_propagate(False)
 
 # controls inside left panel
-controls_frame = tk.Frame(left_panel, bg=THEMES[CURRENT_THEME]["panel"])
+controls_frame = themed(ttk.Frame(left_panel), "Panel.TFrame")
 controls_frame.pack(fill="both", expand=True, padx=12, pady=12)
 
-btn_view_all = tk.Button(controls_frame, text="View All", command=view_all_action)
+search_label = themed(ttk.Label(controls_frame, text="Search name or ID:", anchor="w"), "Panel.TLabel")
+search_label.pack(fill="x")
+search_var = tk.StringVar()
+search_entry = themed(ttk.Entry(controls_frame, textvariable=search_var), "Search.TEntry")
+search_entry.pack(fill="x", pady=(2,6), ipady=2)
+search_var.trace_add("write", on_search_change)
+search_entry.bind("<Return>", on_search_enter)
+search_entry.bind("<Escape>", clear_search)
+
+btn_view_all = themed(ttk.Button(controls_frame, text="View All", command=view_all_action), "Side.TButton")
 btn_view_all.pack(fill="x", pady=6)
 
-btn_view_ind = tk.Button(controls_frame, text="Find Student", command=find_student_action)
+btn_view_ind = themed(ttk.Button(controls_frame, text="Find Student", command=find_student_action), "Side.TButton")
 btn_view_ind.pack(fill="x", pady=6)
 
-btn_add = tk.Button(controls_frame, text="Add Student", command=add_student_action)
+btn_add = themed(ttk.Button(controls_frame, text="Add Student", command=add_student_action), "Side.TButton")
 btn_add.pack(fill="x", pady=6)
 
-btn_update = tk.Button(controls_frame, text="Update Selected", command=update_student_action)
+btn_update = themed(ttk.Button(controls_frame, text="Update Selected", command=update_student_action), "Side.TButton")
 btn_update.pack(fill="x", pady=6)
 
-btn_delete = tk.Button(controls_frame, text="Delete Selected", command=delete_student_action)
+btn_delete = themed(ttk.Button(controls_frame, text="Delete Selected", command=delete_student_action), "Side.TButton")
 btn_delete.pack(fill="x", pady=6)
 
-btn_sort = tk.Button(controls_frame, text="Sort Records", command=sort_records_action)
+btn_sort = themed(ttk.Button(controls_frame, text="Sort Records", command=sort_records_action), "Side.TButton")
 btn_sort.pack(fill="x", pady=6)
 
-btn_highest = tk.Button(controls_frame, text="Show Highest", command=highest_action)
+btn_highest = themed(ttk.Button(controls_frame, text="Show Highest", command=highest_action), "Side.TButton")
 btn_highest.pack(fill="x", pady=6)
 
-btn_lowest = tk.Button(controls_frame, text="Show Lowest", command=lowest_action)
+btn_lowest = themed(ttk.Button(controls_frame, text="Show Lowest", command=lowest_action), "Side.TButton")
 btn_lowest.pack(fill="x", pady=6)
 
-btn_reload = tk.Button(controls_frame, text="Reload File", command=reload_action)
+btn_reload = themed(ttk.Button(controls_frame, text="Reload File", command=reload_action), "Side.TButton")
 btn_reload.pack(fill="x", pady=6)
 
 # right panel
-right_panel = tk.Frame(content_frame, bg=THEMES[CURRENT_THEME]["bg"])
+right_panel = themed(ttk.Frame(content_frame), "Bg.TFrame")
 right_panel.pack(side="left", fill="both", expand=True)
 
-# optional background image label (placed underneath right panel content)
-if bg_photo_img:
-    bg_label = tk.Label(right_panel, image=bg_photo_img)
-    bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+# optional background image, sized to the panel once it is on screen
+right_panel.bind("<Configure>", request_background)
 
 # treeview table
-table_frame = tk.Frame(right_panel, bg=THEMES[CURRENT_THEME]["bg"])
+table_frame = themed(ttk.Frame(right_panel), "Bg.TFrame")
 table_frame.pack(fill="both", expand=True, padx=(0,10), pady=6)
 
 cols = ("ID", "Name", "C1", "C2", "C3", "Exam", "Coursework", "Total", "Percentage", "Grade")
-tree = ttk.Treeview(table_frame, columns=cols, show="headings", selectmode="browse", height=14)
+tree = themed(ttk.Treeview(table_frame, columns=cols, show="headings", selectmode="browse", height=14), "Treeview")
 for c in cols:
     tree.heading(c, text=c, anchor="w")
     tree.column(c, anchor="w", width=80 if c != "Name" else 220, stretch=True)
 
 # add vertical scrollbar
-vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree_yview)
 hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
-tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+tree.configure(yscrollcommand=tree_yscroll, xscrollcommand=hsb.set)
 tree.grid(row=0, column=0, sticky="nsew")
 vsb.grid(row=0, column=1, sticky="ns")
 hsb.grid(row=1, column=0, sticky="ew")
@@ -602,6 +1994,13 @@ table_frame.grid_columnconfigure(0, weight=1)
 # bind selection
 tree.bind("<<TreeviewSelect>>", on_tree_select)
 
+# virtual mode scrolling (wheel, keys, resize)
+for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+    tree.bind(seq, on_tree_wheel)
+for key in ("Up", "Down", "Prior", "Next", "Home", "End"):
+    tree.bind(f"<{key}>", lambda e, k=key: on_tree_key(k))
+tree.bind("<Configure>", on_tree_resize)
+
 # column header click => sort
 def heading_click(event):
     region = tree.identify_region(event.x, event.y)
@@ -616,24 +2015,42 @@ def heading_click(event):
 tree.bind("<Button-1>", heading_click)
 
 # detail card
-detail_card = tk.Frame(right_panel, bg=THEMES[CURRENT_THEME]["card"], relief="raised", bd=0)
-detail_card.pack(fill="x", padx=(0,10), pady=(6,12))
+cards_frame = themed(ttk.Frame(right_panel), "Bg.TFrame")
+cards_frame.pack(fill="x", padx=(0,10), pady=(6,12))
+detail_card = themed(ttk.Frame(cards_frame), "Card.TFrame")
+detail_card.pack(side="left", fill="both", expand=True)
+build_detail_card()
+stats_card = themed(ttk.Frame(cards_frame), "Card.TFrame")
+stats_card.pack(side="left", fill="both", padx=(10,0))
+build_stats_card()
 show_detail(None)
 
 # status bar
-status_bar = tk.Frame(main_frame, bg=THEMES[CURRENT_THEME]["panel"])
+status_bar = themed(ttk.Frame(main_frame), "Panel.TFrame")
 status_bar.pack(fill="x", padx=12, pady=(0,12))
 status_var = tk.StringVar()
-status_label = tk.Label(status_bar, textvariable=status_var, anchor="w", font=("Helvetica", 9), bg=THEMES[CURRENT_THEME]["panel"], fg=THEMES[CURRENT_THEME]["subtext"])
+pending_var = tk.StringVar()
+pending_label = themed(ttk.Label(status_bar, textvariable=pending_var, anchor="e"), "Status.TLabel")
+pending_label.pack(side="right", padx=8, pady=6)
+perf_var = tk.StringVar()
+perf_label = themed(ttk.Label(status_bar, textvariable=perf_var, anchor="e"), "Status.TLabel")  # packed by toggle_perf
+status_label = themed(ttk.Label(status_bar, textvariable=status_var, anchor="w"), "Status.TLabel")
 status_label.pack(fill="x", padx=8, pady=6)
+set_backend(open_backend(FILENAME))
 
 # menu
 menubar = tk.Menu(root)
 filemenu = tk.Menu(menubar, tearoff=0)
+filemenu.add_command(label="Open…", command=open_roster_action)
+filemenu.add_command(label="Import Folder…", command=import_folder_action)
 filemenu.add_command(label="Reload", command=reload_action)
 filemenu.add_command(label="Save", command=save_student_data)
+filemenu.add_command(label="Save As…", command=save_as_action)
+filemenu.add_command(label="Cancel Load", command=cancel_load_action)
+filemenu.add_separator()
+filemenu.add_command(label="Generate Reports…", command=generate_reports_action)
 filemenu.add_separator()
-filemenu.add_command(label="Exit", command=root.quit)
+filemenu.add_command(label="Exit", command=exit_action)
 menubar.add_cascade(label="File", menu=filemenu)
 
 viewmenu = tk.Menu(menubar, tearoff=0)
@@ -641,30 +2058,53 @@ viewmenu = tk.Menu(menubar, tearoff=0)
 viewmenu = tk.Menu(menubar, tearoff=0)
 viewmenu.add_command(label="View All", command=view_all_action)
 viewmenu.add_command(label="Find Student", command=find_student_action)
+viewmenu.add_separator()
+perf_on = tk.BooleanVar(value=bool(os.environ.get(PERF_ENV)))
+viewmenu.add_checkbutton(label="Performance Readout", variable=perf_on, command=toggle_perf, accelerator="F12")
 menubar.add_cascade(label="View", menu=viewmenu)
 
 editmenu = tk.Menu(menubar, tearoff=0)
+editmenu.add_command(label="Undo", command=undo_action, accelerator="Ctrl+Z")  # entries 0 and 1: see update_history_menu
+editmenu.add_command(label="Redo", command=redo_action, accelerator="Ctrl+Y")
+editmenu.add_separator()
 editmenu.add_command(label="Add Student", command=add_student_action)
 editmenu.add_command(label="Update Selected", command=update_student_action)
 editmenu.add_command(label="Delete Selected", command=delete_student_action)
+editmenu.add_separator()
+editmenu.add_command(label="Bulk Import…", command=bulk_import_action)
+editmenu.add_command(label="Adjust Marks…", command=adjust_marks_action)
 menubar.add_cascade(label="Edit", menu=editmenu)
 
 toolsmenu = tk.Menu(menubar, tearoff=0)
 toolsmenu.add_command(label="Sort Records", command=sort_records_action)
 toolsmenu.add_command(label="Highest", command=highest_action)
 toolsmenu.add_command(label="Lowest", command=lowest_action)
+toolsmenu.add_command(label="Grade Distribution", command=grade_distribution_action)
+toolsmenu.add_command(label="Grading Scheme…", command=grading_scheme_action)
+toolsmenu.add_command(label="Timing Report…", command=timing_report_action)
+toolsmenu.add_command(label="Export Trace…", command=export_trace_action)
 toolsmenu.add_separator()
 toolsmenu.add_command(label="Toggle Theme", command=toggle_theme)
 menubar.add_cascade(label="Tools", menu=toolsmenu)
 
 root.config(menu=menubar)
-
-# apply theme and populate
+root.protocol("WM_DELETE_WINDOW", exit_action)
+
+# apply theme and start streaming the roster in
+load_grading_config()
+toggle_perf()
+root.bind("<F12>", toggle_perf)
+root.bind("<Control-z>", undo_action)
+root.bind("<Control-y>", redo_action)
+root.bind("<Control-Shift-Z>", redo_action)
+update_history_menu()
 apply_theme(CURRENT_THEME)
 populate_tree()
 set_status("Ready.")
+root.bind("<Escape>", cancel_load_action)
+start_background_load()
+root.after(WATCH_POLL_MS, poll_watcher)
 
 # run
-root.mainloop()
-
-
+if __name__ == "__main__":
+    root.mainloop()
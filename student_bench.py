@@ -0,0 +1,253 @@
+"""
+Student Manager — benchmark suite
+
+    python student_bench.py                               # 1k, 100k and 1M rows
+    python student_bench.py --sizes 1k,100k --out bench.json
+    python student_bench.py --baseline bench.json         # fail on regressions
+    python student_bench.py --gui --xvfb                  # add the Tk table timings
+
+Generates synthetic studentMarks.txt files and times the roster hot paths:
+load, metrics, save, the Sort Records orders, find by name/ID and
+highest/lowest. With --gui it also imports the app under an X display
+(starting Xvfb with --xvfb) and times populate_tree and
+treeview_sort_column. Each timing is the best of --repeat runs, in
+seconds. Results are written as JSON; --baseline compares against an
+earlier file and exits 1 when anything is more than --tolerance slower.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from student_core import (NameIndex, Roster, RosterStats, SortCache, Student, calc_metrics,
+                          load_student_data, numpy_or_none, save_student_data, write_snapshot, student_line)
+
+# the orders offered by sort_records_action: (key, numeric, reverse)
+SORT_ORDERS = {
+    "sort_name_asc": ("name", False, False),
+    "sort_name_desc": ("name", False, True),
+    "sort_percentage_desc": ("percentage", True, True),
+    "sort_percentage_asc": ("percentage", True, False),
+    "sort_id_asc": ("id", True, False),
+    "sort_id_desc": ("id", True, True),
+}
+FIRST_NAMES = ("Ava", "Ben", "Chloe", "Dan", "Ella", "Finn", "Grace", "Harry", "Isla", "Jack", "Lily", "Max")
+LAST_NAMES = ("Brown", "Clarke", "Davies", "Evans", "Green", "Hall", "Jones", "Khan", "Patel", "Smith", "Wood")
+NOISE_SECONDS = 0.001  # differences below this never count as regressions
+
+# -----------------------
+# Synthetic data
+# -----------------------
+def parse_size(text):
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1000), ("m", 1000000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+def make_students(n, seed=1):
+    rng = random.Random(seed)
+    ids = rng.sample(range(100000, 100000 + 10 * n), n)
+    return [Student(sid, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+                    rng.randint(0, 20), rng.randint(0, 20), rng.randint(0, 20), rng.randint(0, 100))
+            for i, sid in enumerate(ids)]
+
+def write_marks_file(path, students):
+    write_snapshot(path, [student_line(s) for s in students])
+
+# -----------------------
+# Timing
+# -----------------------
+def best_of(repeat, func, setup=None):
+    # fastest of repeat runs; setup() runs untimed before each and its result is passed in
+    best = None
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_core(n, workdir, repeat):
+    path = os.path.join(workdir, f"marks_{n}.txt")
+    write_marks_file(path, make_students(n))
+    out = {}
+    out["load"] = best_of(repeat, lambda: load_student_data(path))
+    students = load_student_data(path)
+    rows = [(s.c1, s.c2, s.c3, s.exam) for s in students]
+    out["calc_metrics"] = best_of(repeat, lambda: [calc_metrics(*r) for r in rows])
+    save_path = os.path.join(workdir, f"save_{n}.txt")
+    out["save"] = best_of(repeat, lambda: save_student_data(students, save_path))
+    for name, spec in SORT_ORDERS.items():
+        out[name] = best_of(repeat, lambda cache: cache.rows(students, spec), SortCache)
+
+    records = list(students)
+    rng = random.Random(2)
+    picks = [rng.choice(records) for _ in range(100)]
+    queries = [s.name.split()[1].lower()[:3] for s in picks]
+    out["find_name_cold"] = best_of(repeat, lambda index: index.search(students, queries[0]), NameIndex)
+    index = NameIndex()
+    index.search(students, queries[0])
+    out["find_name_x100"] = best_of(repeat, lambda: [index.search(students, q) for q in queries])
+    out["find_id_x100"] = best_of(repeat, lambda: [students.get(s.id) for s in picks])
+
+    out["highest_lowest_cold"] = best_of(repeat, lambda stats: (stats.extreme(students, True), stats.extreme(students, False)),
+                                         RosterStats)
+    stats = RosterStats()
+    stats.extreme(students, True)
+    out["highest_lowest"] = best_of(repeat, lambda: (stats.extreme(students, True), stats.extreme(students, False)))
+    return out, students
+
+# -----------------------
+# GUI timings
+# -----------------------
+def start_xvfb():
+    # a private display for the Tk timings; returns the process or None
+    if shutil.which("Xvfb") is None:
+        return None
+    for display in range(99, 110):
+        if os.path.exists(f"/tmp/.X11-unix/X{display}"):
+            continue
+        proc = subprocess.Popen(["Xvfb", f":{display}", "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{display}"):
+                os.environ["DISPLAY"] = f":{display}"
+                return proc
+            time.sleep(0.1)
+        proc.terminate()
+    return None
+
+def load_gui(workdir):
+    # import "excercise 3.py" (it builds its window on import) inside workdir,
+    # so its startup load reads an empty roster there
+    import importlib.util
+    here = os.path.dirname(os.path.abspath(__file__))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        spec = importlib.util.spec_from_file_location("student_gui", os.path.join(here, "excercise 3.py"))
+        gui = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(gui)
+    finally:
+        os.chdir(cwd)
+    deadline = time.monotonic() + 10
+    while not gui.roster_complete and time.monotonic() < deadline:
+        gui.root.update()
+        time.sleep(0.01)
+    return gui
+
+def bench_gui(gui, students, repeat):
+    gui.student_data = Roster(students)
+    gui.view_sort = None
+    gui.root.update()
+    out = {}
+    # the table is redrawn on idle: flush so the timings include it
+    out["populate_tree"] = best_of(repeat, lambda: (gui.populate_tree(), gui.flush_display()))
+    for col, numeric in (("Name", False), ("Total", True)):
+        gui._sort_reverse.clear()
+        out[f"treeview_sort_{col.lower()}"] = best_of(
+            repeat, lambda: (gui.treeview_sort_column(gui.tree, col, numeric), gui.flush_display()))
+    gui.root.update()
+    return out
+
+# -----------------------
+# Baseline comparison
+# -----------------------
+def compare(results, baseline, tolerance):
+    # print new vs baseline per timing; returns the regressions
+    regressions = []
+    print(f"\n{'size':>9}  {'benchmark':<24}{'baseline':>11}{'now':>11}{'change':>9}")
+    for size, timings in results["results"].items():
+        base = baseline.get("results", {}).get(size, {})
+        for name, now in timings.items():
+            old = base.get(name)
+            if not isinstance(old, (int, float)) or not isinstance(now, (int, float)):
+                continue
+            change = (now - old) / old if old else 0.0
+            flag = change > tolerance and now - old > NOISE_SECONDS
+            if flag:
+                regressions.append((size, name, old, now))
+            print(f"{size:>9}  {name:<24}{old:>11.5f}{now:>11.5f}{change:>+8.0%}{'  <-- slower' if flag else ''}")
+    return regressions
+
+# -----------------------
+# Command line
+# -----------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Time the Student Manager roster operations.")
+    parser.add_argument("--sizes", default="1k,100k,1m", help="comma-separated row counts (default 1k,100k,1m)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing; the best is kept (default 3)")
+    parser.add_argument("--out", metavar="PATH", help="write the results as JSON ('-' for stdout)")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with an earlier --out file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs the baseline (default 0.2)")
+    parser.add_argument("--gui", action="store_true", help="also time populate_tree and treeview_sort_column")
+    parser.add_argument("--xvfb", action="store_true", help="run the GUI timings on a private Xvfb display")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    np = numpy_or_none()
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__ if np else None,
+            "repeat": args.repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    xvfb = start_xvfb() if args.gui and args.xvfb and not os.environ.get("DISPLAY") else None
+    workdir = tempfile.mkdtemp(prefix="student_bench.")
+    gui = None
+    try:
+        if args.gui:
+            try:
+                gui = load_gui(workdir)
+            except Exception as e:  # no display, no Tk
+                results["meta"]["gui"] = f"skipped: {e}"
+                print(f"GUI timings skipped: {e}", file=sys.stderr)
+        for n in sizes:
+            print(f"{n} rows…", file=sys.stderr)
+            timings, students = bench_core(n, workdir, args.repeat)
+            if gui is not None:
+                timings.update(bench_gui(gui, students, args.repeat))
+            results["results"][str(n)] = timings
+    finally:
+        if gui is not None:
+            gui.root.destroy()
+        if xvfb is not None:
+            xvfb.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.out != "-":
+        for size, timings in results["results"].items():
+            print(f"\n{size} rows")
+            for name, seconds in timings.items():
+                print(f"  {name:<24}{seconds * 1000:>10.2f} ms")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} timing(s) more than {args.tolerance:.0%} slower than {args.baseline}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Student Manager — headless batch processing
+
+    python student_cli.py studentMarks.txt other.txt --top 5 --bottom 5
+    python student_cli.py studentMarks.txt --sort total --desc --export ranked.csv
+    python student_cli.py roster.db --json > report.json
+    python student_cli.py classes/ --jobs 8 --export all.csv
+    python student_cli.py studentMarks.txt --convert studentMarks.srb
+    python student_cli.py classes/ --export all.csv --trace trace.json
+    python student_cli.py studentMarks.txt --reports reports/ --title "Spring Term 2025"
+    python student_cli.py studentMarks.txt --grading grading.json --scheme exam-heavy
+
+Loads marks files, directories of them or glob patterns (text or SQLite;
+parsed in parallel when there are many), merges them by student ID
+and prints per-grade summaries, top/bottom N, sorted exports and term
+reports (student_reports.py), under any grading scheme from the
+grading file. Never imports tkinter or PIL, so it starts
+quickly and runs without a display.
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import sys
+
+from student_core import (FILENAME, GRADING_FILE, Roster, RosterIngest, SortCache, Student, apply_change,
+                          calc_metrics, columnar, grading_scheme, load_grading_schemes, marks_over, open_backend,
+                          profiler, use_grading_scheme)
+from student_reports import REPORT_FORMATS, generate_reports
+
+EXPORT_FIELDS = Student.__slots__ + Student.DERIVED
+SORT_KEYS = {key: key not in ("name", "grade") for key in EXPORT_FIELDS}  # key -> numeric
+
+# -----------------------
+# Loading
+# -----------------------
+def load_files(specs, workers=None):
+    # merge files, directories and globs; problems are reported on stderr
+    source = RosterIngest(specs, workers)
+    students = Roster()
+    for change in source.iter_changes():
+        apply_change(students, change)
+    for sid, first, path in source.collisions:
+        print(f"warning: {path}: duplicate ID {sid}, already loaded from {first}; skipped", file=sys.stderr)
+    for path, error in source.errors:
+        print(f"error: {path}: {error}", file=sys.stderr)
+    return students, source
+
+# -----------------------
+# Reports
+# -----------------------
+def student_row(s):
+    coursework, total, percentage, grade = s.metrics()
+    return {"id": s.id, "name": s.name, "c1": s.c1, "c2": s.c2, "c3": s.c3, "exam": s.exam,
+            "coursework": coursework, "total": total, "percentage": round(percentage, 2), "grade": grade}
+
+def grade_stats(students):
+    # grade -> [count, sum of percentages, lowest total, highest total]
+    grades = grading_scheme().grades
+    cols = columnar(students)
+    if cols is not None:
+        stats = {}
+        for i, g in enumerate(grades):
+            picked = cols.grade == i
+            totals = cols.total[picked]
+            stats[g] = [len(totals), float(cols.percentage[picked].sum()),
+                        int(totals.min()) if len(totals) else None, int(totals.max()) if len(totals) else None]
+        return stats
+    stats = {g: [0, 0.0, None, None] for g in grades}
+    for s in students:
+        coursework, total, percentage, grade = s.metrics()
+        st = stats[grade]
+        st[0] += 1
+        st[1] += percentage
+        st[2] = total if st[2] is None else min(st[2], total)
+        st[3] = total if st[3] is None else max(st[3], total)
+    return stats
+
+def grade_summary(students):
+    # per grade: count, share of the roster, mean percentage, lowest/highest total
+    stats = grade_stats(students)
+    n = len(students)
+    summary = []
+    for g in grading_scheme().grades:
+        count, percentage_sum, lo, hi = stats[g]
+        summary.append({"grade": g, "count": count,
+                        "share": round(100.0 * count / n, 2) if n else 0.0,
+                        "mean_percentage": round(percentage_sum / count, 2) if count else None,
+                        "min_total": lo, "max_total": hi})
+    return summary
+
+def top_students(students, n, highest=True):
+    # by percentage (the total, unless the scheme weights coursework and
+    # exam differently); ties go to the lower ID
+    if highest:
+        return heapq.nsmallest(n, students, key=lambda s: (-s.percentage, s.id))
+    return heapq.nsmallest(n, students, key=lambda s: (s.percentage, s.id))
+
+def sorted_students(students, key, reverse=False):
+    return SortCache().rows(students, (key, SORT_KEYS[key], reverse))
+
+def print_summary(students, summary):
+    print(f"{len(students)} students")
+    print(f"{'Grade':<6}{'Count':>8}{'Share':>9}{'Mean %':>9}{'Min':>6}{'Max':>6}")
+    for row in summary:
+        mean = f"{row['mean_percentage']:.2f}" if row["count"] else "-"
+        lo = row["min_total"] if row["count"] else "-"
+        hi = row["max_total"] if row["count"] else "-"
+        print(f"{row['grade']:<6}{row['count']:>8}{row['share']:>8.2f}%{mean:>9}{lo:>6}{hi:>6}")
+
+def print_students(title, rows):
+    print()
+    print(title)
+    for s in rows:
+        r = student_row(s)
+        print(f"  {r['id']:>6}  {r['name']:<28} {r['total']:>4}  {r['percentage']:>6.2f}%  {r['grade']}")
+
+# -----------------------
+# Export
+# -----------------------
+def export_format(path, fmt):
+    if fmt:
+        return fmt
+    return "json" if path.lower().endswith(".json") else "csv"
+
+def write_export(rows, out, fmt):
+    # rows are streamed out one at a time
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for s in rows:
+            writer.writerow(student_row(s))
+        return
+    out.write("[")
+    for i, s in enumerate(rows):
+        out.write(",\n  " if i else "\n  ")
+        out.write(json.dumps(student_row(s)))
+    out.write("\n]\n")
+
+def export_students(rows, path, fmt=None):
+    fmt = export_format(path, fmt)
+    if path == "-":
+        write_export(rows, sys.stdout, fmt)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        write_export(rows, f, fmt)
+
+# -----------------------
+# Memory benchmark
+# -----------------------
+# python student_cli.py --bench-memory
+# Compares the old ten-key dict rows with Student records.
+def memory_benchmark(sizes=(100_000, 1_000_000)):
+    import tracemalloc
+
+    def dict_row(i):
+        c1, c2, c3, exam = i % 21, i % 19, i % 23, i % 101
+        coursework, total, percentage, grade = calc_metrics(c1, c2, c3, exam)
+        return {"id": 100000 + i, "name": f"Student {i}", "c1": c1, "c2": c2, "c3": c3, "exam": exam,
+                "coursework": coursework, "total": total, "percentage": percentage, "grade": grade}
+
+    def student_row(i):
+        return Student(100000 + i, f"Student {i}", i % 21, i % 19, i % 23, i % 101)
+
+    print(f"{'rows':>10} {'dict MB':>10} {'Student MB':>11} {'B/row dict':>11} {'B/row Student':>14}")
+    for n in sizes:
+        usage = []
+        for make in (dict_row, student_row):
+            tracemalloc.start()
+            rows = [make(i) for i in range(n)]
+            usage.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del rows
+        print(f"{n:>10} {usage[0] / 2**20:>10.1f} {usage[1] / 2**20:>11.1f} {usage[0] / n:>11.0f} {usage[1] / n:>14.0f}")
+
+# -----------------------
+# Command line
+# -----------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Summarise, rank and export student marks files.")
+    parser.add_argument("files", nargs="*", default=[FILENAME], metavar="FILE",
+                        help=f"marks files, directories or glob patterns; default {FILENAME}")
+    parser.add_argument("--jobs", type=int, metavar="N", help="parser processes (default: one per core)")
+    parser.add_argument("--top", type=int, metavar="N", help="list the N highest percentages")
+    parser.add_argument("--bottom", type=int, metavar="N", help="list the N lowest percentages")
+    parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="id", help="export order (default id)")
+    parser.add_argument("--desc", action="store_true", help="sort the export in descending order")
+    parser.add_argument("--export", metavar="PATH", help="write the sorted roster to PATH ('-' for stdout)")
+    parser.add_argument("--format", choices=("csv", "json"), help="export format (default: from the extension)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--convert", metavar="PATH",
+                        help="save the merged roster as a marks file (.txt, .db or binary .srb)")
+    parser.add_argument("--reports", metavar="DIR", help="write a transcript per student and a class report to DIR")
+    parser.add_argument("--report-format", choices=REPORT_FORMATS, default="html", help="report format (default html)")
+    parser.add_argument("--title", default="Student Transcript", help="heading printed on every report")
+    parser.add_argument("--grading", metavar="FILE", default=GRADING_FILE,
+                        help=f"grading schemes (JSON); default {GRADING_FILE} if it exists")
+    parser.add_argument("--scheme", metavar="NAME", help="grading scheme to use (default: the file's default)")
+    parser.add_argument("--trace", metavar="PATH", help="time the run and write a Chrome trace to PATH")
+    parser.add_argument("--bench-memory", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.bench_memory:
+        memory_benchmark()
+        return 0
+    try:
+        schemes, default = load_grading_schemes(args.grading)
+    except (OSError, ValueError) as e:
+        print(f"error: {args.grading}: {e}", file=sys.stderr)
+        return 2
+    name = args.scheme or default
+    if name not in schemes:
+        print(f"error: no grading scheme {name!r} (have: {', '.join(sorted(schemes))})", file=sys.stderr)
+        return 2
+    use_grading_scheme(schemes[name])
+    profiler.enabled = bool(args.trace)
+    with profiler.span("load"):
+        students, source = load_files(args.files, args.jobs)
+    over = marks_over(students, grading_scheme())
+    if over:
+        print(f"error: {over} student(s) have marks above the maximums of grading scheme "
+              f"{grading_scheme().name!r}", file=sys.stderr)
+        return 2
+
+    report = {"students": len(students), "grades": grade_summary(students)}
+    if args.top:
+        report["top"] = top_students(students, args.top, highest=True)
+    if args.bottom:
+        report["bottom"] = top_students(students, args.bottom, highest=False)
+
+    to_stdout = args.export == "-"
+    if args.json and not to_stdout:
+        for part in ("top", "bottom"):
+            if part in report:
+                report[part] = [student_row(s) for s in report[part]]
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif not to_stdout:
+        print_summary(students, report["grades"])
+        if "top" in report:
+            print_students(f"Top {args.top}", report["top"])
+        if "bottom" in report:
+            print_students(f"Bottom {args.bottom}", report["bottom"])
+
+    if args.export:
+        with profiler.span("export"):
+            export_students(sorted_students(students, args.sort, args.desc), args.export, args.format)
+    if args.convert:
+        with profiler.span("convert"):
+            open_backend(args.convert).save_all(students)
+    if args.reports:
+        with profiler.span("reports"):
+            result = generate_reports(students, args.reports, args.report_format, args.title, args.jobs)
+        print(f"{result['rendered']} transcripts written, {result['skipped']} unchanged, "
+              f"{result['removed']} removed; class report: {result['class_report']}", file=sys.stderr)
+    if args.trace:
+        profiler.export_trace(args.trace)
+    return 1 if source.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1818 @@
+"""
+Student Manager core — records, roster, sorting, search and storage.
+
+No GUI imports: the Tkinter app ("excercise 3.py") and the headless
+CLI (student_cli.py) both build on this module.
+File format expected: studentMarks.txt
+First line: number of students (n)
+Each following line: id,name,c1,c2,c3,exam
+"""
+
+import bisect
+import collections
+import contextlib
+import csv
+import fractions
+import functools
+import glob
+import hashlib
+import json
+import math
+import mmap
+import os
+import queue
+import struct
+import tempfile
+import threading
+import time
+
+np = None  # NumPy, imported on first use by numpy_or_none()
+
+# -----------------------
+# Configuration
+# -----------------------
+FILENAME = "studentMarks.txt"
+GRADING_FILE = "grading.json"  # optional grading schemes, see Grading schemes
+
+
+# -----------------------
+# Instrumentation
+# -----------------------
+# profiler times the hot paths (file I/O, sorting, and in the app tree
+# fills, theme switches and the detail card). It is off by default: a
+# timed function then costs one attribute check and span() hands back a
+# shared no-op context. When on, each call is one (name, start, seconds,
+# thread) sample in a ring of the most recent PROFILE_SAMPLES, and adds to
+# a per-name histogram over PROFILE_BUCKETS_MS that covers the whole
+# session. export_trace() writes the ring in Chrome trace event format
+# (chrome://tracing, Perfetto).
+PROFILE_SAMPLES = 4096
+PROFILE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)  # upper bounds; one more for slower
+
+class Profiler:
+    def __init__(self, size=PROFILE_SAMPLES):
+        self.enabled = False
+        self.origin = time.perf_counter()  # trace timestamps are relative to this
+        self._samples = collections.deque(maxlen=size)
+        self._totals = {}  # name -> [count, seconds, slowest, bucket counts]
+        self._threads = {}  # thread id -> name, for the trace
+        self._lock = threading.Lock()
+
+    def record(self, name, start, seconds):
+        thread = threading.current_thread()
+        ms = seconds * 1000.0
+        with self._lock:
+            self._samples.append((name, start, seconds, thread.ident))
+            self._threads[thread.ident] = thread.name
+            totals = self._totals.get(name)
+            if totals is None:
+                totals = self._totals[name] = [0, 0.0, 0.0, [0] * (len(PROFILE_BUCKETS_MS) + 1)]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+            totals[3][bisect.bisect_left(PROFILE_BUCKETS_MS, ms)] += 1
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def span(self, name):
+        # with profiler.span("name"): ... times the block
+        return self._span(name) if self.enabled else NO_SPAN
+
+    def timed(self, name):
+        # decorator: times every call of the function while enabled
+        def decorate(func):
+            @functools.wraps(func)
+            def timed_call(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter() - start)
+            return timed_call
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def recent(self, n):
+        # the last n samples, newest first: (name, seconds)
+        with self._lock:
+            samples = list(self._samples)[-n:]
+        return [(name, seconds) for name, start, seconds, tid in reversed(samples)]
+
+    def stats(self):
+        # name -> {"count", "mean", "p50", "p95", "max"} in seconds; the
+        # percentiles come from the samples still in the ring
+        with self._lock:
+            samples = list(self._samples)
+            totals = {name: (t[0], t[1], t[2]) for name, t in self._totals.items()}
+        recent = {}
+        for name, start, seconds, tid in samples:
+            recent.setdefault(name, []).append(seconds)
+        out = {}
+        for name, (count, seconds, slowest) in sorted(totals.items()):
+            times = sorted(recent.get(name, ())) or [seconds / count]
+            out[name] = {"count": count, "mean": seconds / count, "max": slowest,
+                         "p50": times[len(times) // 2], "p95": times[min(len(times) - 1, len(times) * 95 // 100)]}
+        return out
+
+    def histogram(self, name):
+        # [(upper bound in ms or None for the open bucket, count)]
+        with self._lock:
+            totals = self._totals.get(name)
+            counts = list(totals[3]) if totals else [0] * (len(PROFILE_BUCKETS_MS) + 1)
+        return list(zip(PROFILE_BUCKETS_MS + (None,), counts))
+
+    def export_trace(self, filename):
+        # complete ("X") events in microseconds, plus the thread names
+        with self._lock:
+            samples = list(self._samples)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in threads.items()]
+        events += [{"name": name, "cat": "student", "ph": "X", "pid": pid, "tid": tid,
+                    "ts": round((start - self.origin) * 1e6, 3), "dur": round(seconds * 1e6, 3)}
+                   for name, start, seconds, tid in samples]
+        atomic_write(filename, lambda f: json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f))
+        return len(samples)
+
+NO_SPAN = contextlib.nullcontext()
+profiler = Profiler()  # shared by everything in the process
+
+# -----------------------
+# Grading schemes
+# -----------------------
+# A scheme sets the most marks for each component, how coursework and exam
+# are weighted, and the lowest percentage for each grade. Schemes can be
+# loaded from GRADING_FILE (JSON; see grading.example.json):
+#   {"default": "standard",
+#    "schemes": {"exam-heavy": {"maximums": {"c1": 20, "c2": 20, "c3": 20, "exam": 100},
+#                               "weights": {"coursework": 30, "exam": 70},
+#                               "boundaries": {"A": 70, "B": 60, "C": 50, "D": 40, "F": 0}}}}
+# Without "weights" the marks simply add up (percentage = total / sum of
+# maximums), which is the standard scheme built in here.
+#
+# A scheme is compiled to integer arithmetic: each coursework and exam mark
+# is worth a whole number of score units (scale units = 1%), and every
+# boundary becomes the lowest score holding its grade. A grade is then one
+# bisect over those thresholds (np.searchsorted for a whole column) with no
+# floating point near the boundaries; percentage is the score / scale.
+class GradingScheme:
+    def __init__(self, name, maximums, boundaries, weights=None):
+        # boundaries: {grade: lowest percentage}, in any order
+        self.name = name
+        self.maximums = {field: int(maximums[field]) for field in ("c1", "c2", "c3", "exam")}
+        if min(self.maximums.values()) <= 0:
+            raise ValueError(f"grading scheme {name!r}: every maximum must be above 0")
+        ranked = sorted(boundaries.items(), key=lambda item: -item[1])
+        if not ranked:
+            raise ValueError(f"grading scheme {name!r} has no grade boundaries")
+        self.boundaries = tuple((str(grade), float(lowest)) for grade, lowest in ranked)
+        self.grades = tuple(grade for grade, lowest in self.boundaries)  # best first
+        self.weights = dict(weights) if weights else None
+        coursework_max = self.maximums["c1"] + self.maximums["c2"] + self.maximums["c3"]
+        self.total_max = coursework_max + self.maximums["exam"]
+        if self.weights is None:
+            per_coursework = per_exam = fractions.Fraction(100, self.total_max)
+        else:
+            w_coursework = fractions.Fraction(str(self.weights["coursework"]))
+            w_exam = fractions.Fraction(str(self.weights["exam"]))
+            if w_coursework < 0 or w_exam < 0 or w_coursework + w_exam != 100:
+                raise ValueError(f"grading scheme {name!r}: the weights must add up to 100")
+            per_coursework = w_coursework / coursework_max
+            per_exam = w_exam / self.maximums["exam"]
+        self.scale = math.lcm(per_coursework.denominator, per_exam.denominator)
+        self._coursework_units = int(per_coursework * self.scale)
+        self._exam_units = int(per_exam * self.scale)
+        # marks add up as plain totals: storage can sort percentage by total
+        self.proportional = self._coursework_units == self._exam_units
+        # thresholds of every grade but the lowest, ascending; the lowest
+        # grade takes everything below them
+        self._thresholds = [math.ceil(fractions.Fraction(str(lowest)) * self.scale)
+                            for grade, lowest in reversed(self.boundaries[:-1])]
+        self._ascending = self.grades[::-1]
+        self._thresholds_array = None
+
+    def __repr__(self):
+        return f"GradingScheme({self.name!r})"
+
+    def signature(self):
+        # everything that decides a student's percentage and grade
+        return (self.maximums, self.weights, self.boundaries)
+
+    def score(self, coursework, exam):
+        return coursework * self._coursework_units + exam * self._exam_units
+
+    def grade_of(self, score):
+        return self._ascending[bisect.bisect_right(self._thresholds, score)]
+
+    def metrics(self, c1, c2, c3, exam):
+        coursework = c1 + c2 + c3
+        score = coursework * self._coursework_units + exam * self._exam_units
+        return (coursework, coursework + exam, score / self.scale,
+                self._ascending[bisect.bisect_right(self._thresholds, score)])
+
+    def bulk(self, c1, c2, c3, exam):
+        # array version of metrics: (coursework, total, score, percentage,
+        # grade), grade being an index into self.grades
+        if self._thresholds_array is None:
+            self._thresholds_array = np.array(self._thresholds, dtype=np.int64)
+        coursework = c1.astype(np.int64) + c2 + c3
+        score = coursework * self._coursework_units + exam.astype(np.int64) * self._exam_units
+        grade = len(self._thresholds) - np.searchsorted(self._thresholds_array, score, side="right")
+        return coursework, coursework + exam, score, score / self.scale, grade
+
+STANDARD_SCHEME = GradingScheme("standard", {"c1": 20, "c2": 20, "c3": 20, "exam": 100},
+                                {"A": 70, "B": 60, "C": 50, "D": 40, "F": 0})
+
+_grading = STANDARD_SCHEME  # the active scheme: change it with use_grading_scheme()
+
+def grading_scheme():
+    return _grading
+
+def use_grading_scheme(scheme):
+    # MARK_LIMITS is updated in place, so modules that imported it see the change
+    global _grading
+    _grading = scheme
+    MARK_LIMITS.clear()
+    MARK_LIMITS.update(scheme.maximums)
+
+def load_grading_schemes(filename=GRADING_FILE):
+    # ({name: GradingScheme}, default name); just the standard scheme when
+    # there is no file. A bad file raises ValueError (or OSError).
+    schemes = {STANDARD_SCHEME.name: STANDARD_SCHEME}
+    if not os.path.exists(filename):
+        return schemes, STANDARD_SCHEME.name
+    with open(filename, encoding="utf-8") as f:
+        config = json.load(f)
+    try:
+        for name, spec in config.get("schemes", {}).items():
+            schemes[name] = GradingScheme(name, spec.get("maximums", STANDARD_SCHEME.maximums),
+                                          spec["boundaries"], spec.get("weights"))
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"{filename}: malformed grading scheme ({e})")
+    default = config.get("default", STANDARD_SCHEME.name)
+    if default not in schemes:
+        raise ValueError(f"{filename}: default scheme {default!r} is not defined")
+    return schemes, default
+
+def marks_over(students, scheme):
+    # how many students have a mark above the scheme's maximum for it
+    cols = columnar(students)
+    if cols is not None:
+        over = np.zeros(len(cols.ids), dtype=bool)
+        for field in ("c1", "c2", "c3", "exam"):
+            over |= getattr(cols, field) > scheme.maximums[field]
+        return int(over.sum())
+    return sum(1 for s in students if any(s[field] > scheme.maximums[field] for field in ("c1", "c2", "c3", "exam")))
+
+def regrade(students, scheme):
+    # make scheme the active one, reclassifying the roster in one batch
+    # (one vectorized pass when the columnar engine applies). Returns
+    # (records whose percentage or grade changed, how many grades changed).
+    # Refused (ValueError) when marks exceed the scheme's maximums: MARK_LIMITS
+    # follows the scheme, so those marks would be clamped or rejected later.
+    over = marks_over(students, scheme)
+    if over:
+        raise ValueError(f"{over} student(s) have marks above the maximums of grading scheme {scheme.name!r}")
+    old = _grading
+    cols = columnar(students)
+    if cols is not None:
+        _, _, _, percentage, grade = scheme.bulk(cols.c1, cols.c2, cols.c3, cols.exam)
+        regraded = np.array(scheme.grades, dtype=object)[grade] != np.array(old.grades, dtype=object)[cols.grade]
+        changed = np.flatnonzero(regraded | (percentage != cols.percentage))
+        records = [cols.records[i] for i in changed.tolist()]
+        grades_changed = int(regraded.sum())
+    else:
+        records, grades_changed = [], 0
+        for s in students:
+            before = old.metrics(s.c1, s.c2, s.c3, s.exam)
+            after = scheme.metrics(s.c1, s.c2, s.c3, s.exam)
+            if before[2:] != after[2:]:
+                records.append(s)
+                grades_changed += before[3] != after[3]
+    use_grading_scheme(scheme)
+    students.version += 1  # the derived caches (columns, orders, stats) rebuild under scheme
+    return records, grades_changed
+
+# -----------------------
+# Utility functions
+# -----------------------
+def calc_metrics(c1, c2, c3, exam):
+    # (coursework, total, percentage, grade) under the active grading scheme
+    return _grading.metrics(c1, c2, c3, exam)
+
+# -----------------------
+# Student record
+# -----------------------
+class Student:
+    # One roster row. Only the ID, name and four raw marks are stored;
+    # coursework/total/percentage/grade are derived from them on access.
+    # s["key"] reads and writes like the old dict records did.
+    __slots__ = ("id", "name", "c1", "c2", "c3", "exam")
+    DERIVED = ("coursework", "total", "percentage", "grade")
+
+    def __init__(self, sid, name, c1, c2, c3, exam):
+        self.id = sid
+        self.name = name
+        self.c1 = c1
+        self.c2 = c2
+        self.c3 = c3
+        self.exam = exam
+
+    def metrics(self):
+        return _grading.metrics(self.c1, self.c2, self.c3, self.exam)
+
+    @property
+    def coursework(self):
+        return self.c1 + self.c2 + self.c3
+
+    @property
+    def total(self):
+        return self.c1 + self.c2 + self.c3 + self.exam
+
+    @property
+    def percentage(self):
+        return self.metrics()[2]
+
+    @property
+    def grade(self):
+        return self.metrics()[3]
+
+    def __getitem__(self, key):
+        if key not in Student.__slots__ and key not in Student.DERIVED:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in Student.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self):
+        # plain dict snapshot, as handed to AddOrUpdateDialog
+        return {key: getattr(self, key) for key in Student.__slots__ + Student.DERIVED}
+
+    def __repr__(self):
+        return f"Student({self.id!r}, {self.name!r}, {self.c1}, {self.c2}, {self.c3}, {self.exam})"
+
+# -----------------------
+# Roster store
+# -----------------------
+class Roster:
+    # Student records keyed by ID. A dict keeps insertion order, so it is both
+    # the ordered storage and the id -> record index: lookups, duplicate
+    # checks and removals are O(1) while iteration stays in roster order.
+    def __init__(self, records=()):
+        self._by_id = {}
+        self.version = 0  # bumped on every change; derived caches compare it
+        for s in records:
+            self.put(s)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, sid):
+        return sid in self._by_id
+
+    def get(self, sid):
+        return self._by_id.get(sid)
+
+    def put(self, s):
+        # insert or replace (a replaced record keeps its position)
+        self._by_id[s["id"]] = s
+        self.version += 1
+
+    def append(self, s):
+        if s["id"] in self._by_id:
+            raise ValueError(f"Duplicate student ID {s['id']}")
+        self._by_id[s["id"]] = s
+        self.version += 1
+
+    def remove(self, s):
+        del self._by_id[s["id"]]
+        self.version += 1
+
+    def sort(self, key=None, reverse=False):
+        self.reorder(sorted(self._by_id.values(), key=key, reverse=reverse))
+
+    def reorder(self, ordered):
+        # ordered: every record of the roster, in the new order
+        self._by_id = {s["id"]: s for s in ordered}
+        self.version += 1
+
+# -----------------------
+# Columnar engine (optional, NumPy)
+# -----------------------
+# For large rosters the marks are mirrored into NumPy arrays so metrics,
+# sorting, the statistics build and the grade distribution are single
+# vectorized operations. The dict records stay the source of truth; the arrays are
+# rebuilt lazily when Roster.version moves on.
+COLUMNAR_THRESHOLD = 10000
+
+def numpy_or_none():
+    # import NumPy the first time a roster is big enough to need it, so
+    # tools that never get there (the CLI on small files) start fast
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # the columnar engine is optional
+            return None
+        np = numpy
+    return np
+
+class ColumnarRoster:
+    def __init__(self, records, columns=None):
+        # columns: (ids, c1, c2, c3, exam) arrays when the roster already
+        # has them (MappedRoster); records then only needs indexing
+        if columns is None:
+            self.records = list(records)
+            n = len(self.records)
+            ids = np.fromiter((s["id"] for s in self.records), dtype=np.int64, count=n)
+            marks = np.fromiter((m for s in self.records for m in (s["c1"], s["c2"], s["c3"], s["exam"])),
+                                dtype=np.int32, count=4 * n).reshape(n, 4)
+            columns = (ids, *marks.T)
+        else:
+            self.records = records
+        self.ids, self.c1, self.c2, self.c3, self.exam = columns
+        # grade: index into scheme.grades
+        self.scheme = _grading
+        self.coursework, self.total, self.score, self.percentage, self.grade = self.scheme.bulk(
+            self.c1, self.c2, self.c3, self.exam)
+        self._names = None
+
+    def column(self, key):
+        if key == "name":
+            if self._names is None:
+                self._names = np.array([s["name"].lower() for s in self.records])
+            return self._names
+        if key == "id":
+            return self.ids
+        return getattr(self, key)
+
+    def order(self, key, reverse=False):
+        # stable, like list.sort: equal keys keep roster order in both directions
+        values = self.column(key)
+        if not reverse:
+            return np.argsort(values, kind="stable")
+        return len(values) - 1 - np.argsort(values[::-1], kind="stable")[::-1]
+
+    def sorted_records(self, key, reverse=False):
+        records = self.records
+        return [records[i] for i in self.order(key, reverse).tolist()]
+
+    def grade_counts(self):
+        counts = np.bincount(self.grade, minlength=len(self.scheme.grades))
+        return dict(zip(self.scheme.grades, counts.tolist()))
+
+_columnar_cache = (None, None, None)  # (roster, version, ColumnarRoster)
+
+def columnar(students):
+    # the cached columnar mirror of a roster, or None when plain Python is better
+    global _columnar_cache
+    if len(students) < COLUMNAR_THRESHOLD or numpy_or_none() is None:
+        return None
+    roster, version, cols = _columnar_cache
+    if roster is not students or version != students.version or cols.scheme is not _grading:
+        cols = ColumnarRoster(students, students.columns() if isinstance(students, MappedRoster) else None)
+        _columnar_cache = (students, students.version, cols)
+    return cols
+
+# -----------------------
+# Sort service
+# -----------------------
+# Display orders are computed once per (key, numeric, reverse) and cached.
+# Edits patch every cached order in place (binary-search insert, removal
+# by identity) instead of throwing them away, so flipping between column
+# sorts on a big roster only copies a cached list. The cache checks
+# Roster.version and starts over if it missed a change.
+SORT_CACHE_SIZE = 6  # each order is one pointer per student
+
+def sort_key(key, numeric):
+    if numeric:
+        return lambda s: s[key]
+    return lambda s: str(s[key]).lower()
+
+def bisect_position(rows, s, spec):
+    # index in rows (sorted by spec) where s belongs, after equal keys
+    key, numeric, reverse = spec
+    keyfunc = sort_key(key, numeric)
+    k = keyfunc(s)
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mk = keyfunc(rows[mid])
+        if (k > mk) if reverse else (k < mk):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+class SortCache:
+    def __init__(self):
+        self._orders = {}
+        self._roster = None
+        self._version = None
+
+    def _check(self, students):
+        if self._roster is not students or self._version != students.version:
+            self._orders.clear()
+            self._roster = students
+            self._version = students.version
+
+    @profiler.timed("sort")
+    def rows(self, students, spec, source=None):
+        # a fresh list of the roster in spec order; source is a storage
+        # backend holding the same roster that may sort it for us
+        self._check(students)
+        order = self._orders.pop(spec, None)
+        if order is None:
+            key, numeric, reverse = spec
+            cols = columnar(students)
+            ids = source.sorted_ids(key, reverse) if cols is None and source is not None else None
+            if cols is not None:
+                order = cols.sorted_records(key, reverse)
+            elif ids is not None and len(ids) == len(students):
+                order = [students.get(sid) for sid in ids]
+                if any(s is None for s in order):
+                    order = None  # same count, different students: the file changed underneath us
+            if order is None:
+                order = sorted(students, key=sort_key(key, numeric), reverse=reverse)
+        self._orders[spec] = order  # most recently used last
+        while len(self._orders) > SORT_CACHE_SIZE:
+            del self._orders[next(iter(self._orders))]
+        return list(order)
+
+    def _synced(self, students, changes):
+        # students has moved on by exactly `changes` versions since our last sync
+        if self._roster is not students or self._version + changes != students.version:
+            self._orders.clear()
+            self._roster = students
+            self._version = students.version
+            return False
+        self._version = students.version
+        return True
+
+    def insert(self, students, s):
+        if self._synced(students, 1):
+            for spec, order in self._orders.items():
+                order.insert(bisect_position(order, s, spec), s)
+
+    def update(self, students, s):
+        # s was changed in place and re-put into the roster
+        if self._synced(students, 1):
+            for spec, order in self._orders.items():
+                del order[order.index(s)]
+                order.insert(bisect_position(order, s, spec), s)
+
+    def reordered(self, students):
+        # same records in a new roster order: cached orders stay valid
+        self._synced(students, 1)
+
+    def remove(self, students, s):
+        if self._synced(students, 1):
+            for order in self._orders.values():
+                del order[order.index(s)]
+
+
+# -----------------------
+# Name index
+# -----------------------
+# Search matches an exact student ID or, for names, every query word as the
+# prefix of some word of the name. Each lowercase name word maps to the IDs
+# that contain it, and a sorted list of the distinct words turns a prefix
+# into a bisect plus a short scan. Like SortCache it is patched on edits
+# and rebuilt if Roster.version shows it missed one.
+def name_words(name):
+    return set(name.lower().split())
+
+def search_matches(s, query):
+    # query is already stripped and lowercased
+    if query == str(s.id):
+        return True
+    words = name_words(s.name)
+    return all(any(w.startswith(q) for w in words) for q in query.split())
+
+class NameIndex:
+    def __init__(self):
+        self._roster = None
+        self._version = None
+        self._postings = None  # word -> [student ids]; None until built
+        self._words = []       # sorted distinct words
+
+    def _build(self, students):
+        self._postings = {}
+        for s in students:
+            for w in name_words(s.name):
+                posting = self._postings.get(w)
+                if posting is None:
+                    self._postings[w] = [s.id]
+                else:
+                    posting.append(s.id)
+        self._words = sorted(self._postings)
+        self._roster = students
+        self._version = students.version
+
+    def _add(self, sid, name):
+        for w in name_words(name):
+            posting = self._postings.get(w)
+            if posting is None:
+                self._postings[w] = [sid]
+                bisect.insort(self._words, w)
+            else:
+                posting.append(sid)
+
+    def _discard(self, sid, name):
+        for w in name_words(name):
+            posting = self._postings[w]
+            posting.remove(sid)
+            if not posting:
+                del self._postings[w]
+                del self._words[bisect.bisect_left(self._words, w)]
+
+    def _synced(self, students, changes):
+        if self._postings is None:
+            return False
+        if self._roster is not students or self._version + changes != students.version:
+            self._postings = None  # rebuild on the next search
+            return False
+        self._version = students.version
+        return True
+
+    def insert(self, students, s):
+        if self._synced(students, 1):
+            self._add(s.id, s.name)
+
+    def update(self, students, s, old_name):
+        if self._synced(students, 1):
+            self._discard(s.id, old_name)
+            self._add(s.id, s.name)
+
+    def remove(self, students, s):
+        if self._synced(students, 1):
+            self._discard(s.id, s.name)
+
+    def search(self, students, query):
+        # set of matching IDs; query is stripped and lowercased
+        if self._postings is None or self._roster is not students or self._version != students.version:
+            self._build(students)
+        words = query.split()
+        if not words:
+            return set()
+        ids = set()
+        longest = max(words, key=len)  # narrowest posting range
+        i = bisect.bisect_left(self._words, longest)
+        while i < len(self._words) and self._words[i].startswith(longest):
+            ids.update(self._postings[self._words[i]])
+            i += 1
+        if len(words) > 1:
+            ids = {sid for sid in ids if search_matches(students.get(sid), query)}
+        if query.isdigit() and int(query) in students:
+            ids.add(int(query))
+        return ids
+
+# -----------------------
+# Roster statistics
+# -----------------------
+# Class-wide aggregates patched by the edit callbacks instead of rescanned:
+# running sums, per-grade counts and the roster bucketed by score (the
+# grading scheme's integer percentage, see GradingScheme: a count per
+# score, the distinct scores in a sorted list, the sorted IDs holding each
+# score). Highest/lowest, top/bottom N and percentiles walk the distinct
+# scores rather than the students, and an edit is a few bisects.
+# The first build is vectorized when the columnar engine applies; buckets
+# are then filled from its arrays the first time each one is needed.
+# Like SortCache it rebuilds if Roster.version shows it missed an edit.
+class RosterStats:
+    def __init__(self):
+        self._roster = None
+        self._version = None
+
+    def _build(self, students):
+        self._roster = students
+        self._version = students.version
+        self._scheme = scheme = _grading
+        self._cols = cols = columnar(students)
+        self._buckets = {}  # score -> sorted ids; never dropped, so _cols is only read for untouched scores
+        if cols is not None:
+            self.count = len(students)
+            self.coursework_sum = int(cols.coursework.sum())
+            self.exam_sum = int(cols.exam.sum())
+            scores, counts = np.unique(cols.score, return_counts=True)
+            self._hist = dict(zip(scores.tolist(), counts.tolist()))
+            self._scores = scores.tolist()
+            self.grades = cols.grade_counts()
+        else:
+            self.count = self.coursework_sum = self.exam_sum = 0
+            self._hist = {}
+            self._scores = []
+            self.grades = dict.fromkeys(scheme.grades, 0)
+            for s in students:
+                self._add(s.id, s.coursework, s.exam)
+
+    def _check(self, students):
+        if self._roster is not students or self._version != students.version or self._scheme is not _grading:
+            self._build(students)
+
+    def _synced(self, students, changes):
+        # students has moved on by exactly `changes` versions since our last sync
+        if self._roster is not students or self._version + changes != students.version:
+            self._roster = None  # rebuild on the next query
+            return False
+        self._version = students.version
+        return True
+
+    def _bucket(self, score):
+        ids = self._buckets.get(score)
+        if ids is None:
+            if self._cols is not None and score in self._hist:
+                ids = sorted(self._cols.ids[self._cols.score == score].tolist())
+            else:
+                ids = []
+            self._buckets[score] = ids
+        return ids
+
+    def _add(self, sid, coursework, exam):
+        score = self._scheme.score(coursework, exam)
+        bisect.insort(self._bucket(score), sid)
+        if score in self._hist:
+            self._hist[score] += 1
+        else:
+            self._hist[score] = 1
+            bisect.insort(self._scores, score)
+        self.count += 1
+        self.coursework_sum += coursework
+        self.exam_sum += exam
+        self.grades[self._scheme.grade_of(score)] += 1
+
+    def _discard(self, sid, coursework, exam):
+        score = self._scheme.score(coursework, exam)
+        ids = self._bucket(score)
+        del ids[bisect.bisect_left(ids, sid)]
+        self._hist[score] -= 1
+        if not self._hist[score]:
+            del self._hist[score]
+            del self._scores[bisect.bisect_left(self._scores, score)]
+        self.count -= 1
+        self.coursework_sum -= coursework
+        self.exam_sum -= exam
+        self.grades[self._scheme.grade_of(score)] -= 1
+
+    def insert(self, students, s):
+        if self._synced(students, 1):
+            self._add(s.id, s.coursework, s.exam)
+
+    def update(self, students, s, old):
+        # old: s.copy() from before the edit
+        if self._synced(students, 1):
+            self._discard(old["id"], old["coursework"], old["exam"])
+            self._add(s.id, s.coursework, s.exam)
+
+    def remove(self, students, s):
+        if self._synced(students, 1):
+            self._discard(s.id, s.coursework, s.exam)
+
+    def _score_at(self, k):
+        # the k-th smallest score (0-based)
+        for score in self._scores:
+            k -= self._hist[score]
+            if k < 0:
+                return score
+        raise IndexError(k)
+
+    def percentile(self, students, p):
+        # p-th percentile of the percentages, interpolated like statistics.median
+        self._check(students)
+        if not self.count:
+            return None
+        pos = (self.count - 1) * p / 100.0
+        lo = int(pos)
+        low = self._score_at(lo)
+        if pos != lo:
+            low += (self._score_at(lo + 1) - low) * (pos - lo)
+        return low / self._scheme.scale
+
+    def ranked(self, students, n, highest=True):
+        # the n highest (or lowest) percentages; equal ones go to the lower ID
+        self._check(students)
+        out = []
+        for score in (reversed(self._scores) if highest else self._scores):
+            for sid in self._bucket(score):
+                if len(out) == n:
+                    return out
+                out.append(students.get(sid))
+        return out
+
+    def extreme(self, students, highest=True):
+        ranked = self.ranked(students, 1, highest)
+        return ranked[0] if ranked else None
+
+    def summary(self, students):
+        self._check(students)
+        n = self.count
+        score_sum = self._scheme.score(self.coursework_sum, self.exam_sum)
+        return {
+            "count": n,
+            "mean_percentage": score_sum / n / self._scheme.scale if n else None,
+            "median_percentage": self.percentile(students, 50) if n else None,
+            "mean_coursework": self.coursework_sum / n if n else None,
+            "mean_exam": self.exam_sum / n if n else None,
+            "grades": dict(self.grades),
+        }
+
+# -----------------------
+# File handling
+# -----------------------
+def parse_student_line(line):
+    # "id,name,c1,c2,c3,exam" -> record, or None if the line has the wrong shape
+    parts = [p.strip() for p in line.split(",")]
+    if len(parts) != 6:
+        return None
+    c1, c2, c3, exam = map(int, parts[2:])
+    return Student(int(parts[0]), parts[1], c1, c2, c3, exam)
+
+def student_line(s):
+    return f"{s['id']},{s['name']},{s['c1']},{s['c2']},{s['c3']},{s['exam']}"
+
+def iter_student_records(lines):
+    # parse raw lines one at a time; the first line is the student count
+    first = True
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if first:
+            first = False
+            try:
+                n = int(line)
+            except ValueError:
+                pass  # fallback: treat all lines as records
+            else:
+                continue
+        s = parse_student_line(line)
+        if s:
+            yield s
+
+def apply_change(students, change):
+    # change: ("put", Student) or ("delete", student id), as yielded by iter_changes
+    op, value = change
+    if op == "put":
+        students.put(value)
+    else:
+        s = students.get(value)
+        if s:
+            students.remove(s)
+
+@profiler.timed("load_student_data")
+def load_student_data(filename=FILENAME):
+    # read a whole roster; errors propagate to the caller
+    students = Roster()
+    for change in open_backend(filename).iter_changes():
+        apply_change(students, change)
+    return students
+
+@profiler.timed("save_student_data")
+def save_student_data(students, filename=FILENAME):
+    open_backend(filename).save_all(students)
+
+# -----------------------
+# Bulk changes
+# -----------------------
+# Many students at once: rows pasted or imported as CSV, or one mark
+# shifted across a set of students. Everything is validated before
+# anything changes, then apply_bulk updates the roster in one go and
+# returns what changed, so the caller can save once and refresh once.
+MARK_FIELDS = ("c1", "c2", "c3", "exam")
+MARK_LIMITS = dict(STANDARD_SCHEME.maximums)  # the active scheme's; see use_grading_scheme
+
+def check_student(sid, name, marks):
+    # the problem with one row, or None
+    if not name:
+        return "name is empty"
+    if "," in name:
+        return "name contains a comma"
+    for field, mark in zip(MARK_FIELDS, marks):
+        if not 0 <= mark <= MARK_LIMITS[field]:
+            return f"{field} must be between 0 and {MARK_LIMITS[field]}"
+    return None
+
+def parse_bulk_rows(text):
+    # CSV "id,name,c1,c2,c3,exam" (an optional header is skipped) ->
+    # (records, errors), errors being (line number, message)
+    records, errors, seen = [], [], {}
+    for n, row in enumerate(csv.reader(text.splitlines()), 1):
+        row = [cell.strip() for cell in row]
+        if not any(row):
+            continue
+        if n == 1 and row[0].lower() == "id":
+            continue
+        if len(row) != 6:
+            errors.append((n, f"expected 6 values, got {len(row)}"))
+            continue
+        try:
+            sid, c1, c2, c3, exam = int(row[0]), int(row[2]), int(row[3]), int(row[4]), int(row[5])
+        except ValueError:
+            errors.append((n, "ID and marks must be whole numbers"))
+            continue
+        problem = check_student(sid, row[1], (c1, c2, c3, exam))
+        if problem is None and sid in seen:
+            problem = f"ID {sid} already given on line {seen[sid]}"
+        if problem:
+            errors.append((n, problem))
+            continue
+        seen[sid] = n
+        records.append(Student(sid, row[1], c1, c2, c3, exam))
+    return records, errors
+
+def adjust_marks(records, field, delta):
+    # copies of records with field moved by delta, clamped to its range
+    limit = MARK_LIMITS[field]
+    adjusted = []
+    for s in records:
+        r = Student(s.id, s.name, s.c1, s.c2, s.c3, s.exam)
+        r[field] = max(0, min(limit, s[field] + delta))
+        adjusted.append(r)
+    return adjusted
+
+def apply_bulk(students, records):
+    # records: validated Students, new or replacing the one with their ID.
+    # Existing records are updated in place. Returns [(s, old)] for every
+    # student that changed, old being s.copy() from before (None if added).
+    changes = []
+    for r in records:
+        s = students.get(r.id)
+        if s is None:
+            students.append(r)
+            changes.append((r, None))
+        elif (s.name, s.c1, s.c2, s.c3, s.exam) != (r.name, r.c1, r.c2, r.c3, r.exam):
+            old = s.copy()
+            s.name, s.c1, s.c2, s.c3, s.exam = r.name, r.c1, r.c2, r.c3, r.exam
+            students.put(s)
+            changes.append((s, old))
+    return changes
+
+# -----------------------
+# Edit history
+# -----------------------
+# Undo/redo keeps small inverse records instead of roster snapshots:
+#   ("insert", values)                          a student was added
+#   ("delete", values)                          a student was deleted
+#   ("update", sid, ((field, old, new), ...))   only the fields that changed
+#   ("bulk", (step, ...))                       one Bulk Import / Adjust Marks
+# values is student_values(s). Records are found again by ID, so a step
+# survives the roster being copied (edit_roster) but not replaced by a
+# load. The oldest steps are dropped beyond HISTORY_DEPTH steps or
+# HISTORY_MAX_ROWS rows in all; a single step over HISTORY_MAX_ROWS is not
+# kept and clears the history instead. An undone delete comes back at the
+# end of the roster order.
+HISTORY_DEPTH = 50
+HISTORY_MAX_ROWS = 200000  # bulk steps count one per student
+EDIT_FIELDS = ("name",) + MARK_FIELDS
+
+def student_values(s):
+    return (s.id, s.name, s.c1, s.c2, s.c3, s.exam)
+
+def copy_values(old):
+    # student_values of an s.copy() dict
+    return (old["id"],) + tuple(old[f] for f in EDIT_FIELDS)
+
+def edit_step(s, old):
+    # the step for one change: old is s.copy() from before, None if s was added
+    if old is None:
+        return ("insert", student_values(s))
+    diff = tuple((f, old[f], s[f]) for f in EDIT_FIELDS if old[f] != s[f])
+    return ("update", s.id, diff) if diff else None
+
+def step_rows(step):
+    return len(step[1]) if step[0] == "bulk" else 1
+
+def apply_step(students, step, undo=False):
+    # replay step, or its inverse. Returns [(kind, s, old)] with kind
+    # "added", "removed" or "updated" (old: s.copy() from before); steps
+    # that no longer apply (the record is gone or already back) are skipped
+    kind = step[0]
+    if kind == "bulk":
+        steps = reversed(step[1]) if undo else step[1]
+        return [effect for sub in steps for effect in apply_step(students, sub, undo)]
+    if kind == "update":
+        s = students.get(step[1])
+        if s is None:
+            return []
+        old = s.copy()
+        for field, before, after in step[2]:
+            s[field] = before if undo else after
+        students.put(s)
+        return [("updated", s, old)]
+    values = step[1]
+    if (kind == "insert") != undo:
+        if values[0] in students:
+            return []
+        s = Student(*values)
+        students.append(s)
+        return [("added", s, None)]
+    s = students.get(values[0])
+    if s is None:
+        return []
+    students.remove(s)
+    return [("removed", s, None)]
+
+class EditHistory:
+    def __init__(self, depth=HISTORY_DEPTH, max_rows=HISTORY_MAX_ROWS):
+        self.depth = depth
+        self.max_rows = max_rows
+        self._undo = collections.deque()  # (label, step), newest last
+        self._redo = []
+        self._rows = 0  # rows held by _undo and _redo
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._rows = 0
+
+    def record(self, step, label):
+        # label names the step in the menu, e.g. "Delete Ann Smith". False:
+        # the step was too large to keep, and the history is now empty
+        if step is None or (step[0] == "bulk" and not step[1]):
+            return True
+        rows = step_rows(step)
+        if rows > self.max_rows:
+            self.clear()  # older steps can't be undone past this one anyway
+            return False
+        self._rows -= sum(step_rows(st) for lb, st in self._redo)
+        self._redo.clear()
+        self._undo.append((label, step))
+        self._rows += rows
+        while len(self._undo) > self.depth or self._rows > self.max_rows:
+            self._rows -= step_rows(self._undo.popleft()[1])
+        return True
+
+    def undo_label(self):
+        return self._undo[-1][0] if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1][0] if self._redo else None
+
+    def undo(self, students):
+        # (label, effects) of the step undone; (None, []) if there is none
+        if not self._undo:
+            return None, []
+        label, step = self._undo.pop()
+        self._redo.append((label, step))
+        return label, apply_step(students, step, undo=True)
+
+    def redo(self, students):
+        if not self._redo:
+            return None, []
+        label, step = self._redo.pop()
+        self._undo.append((label, step))
+        return label, apply_step(students, step)
+
+# -----------------------
+# Storage backends
+# -----------------------
+# A backend streams a roster in as changes and persists edits:
+#   iter_changes(progress)  yields ("put", Student) / ("delete", id) in order;
+#                           progress(fraction) is called along the way
+#   apply(changes)          persist a batch of changes in that format, as one
+#                           write (only if incremental is True)
+#   save_all(students)      replace the stored roster
+#   needs_compaction()      True once applied changes should be folded into a
+#                           fresh save_all
+#   writable                False for sources that can't take edits at all
+#   watch_paths()           the files to poll for outside changes
+# Query push-down (sorted_ids) returns None when the backend
+# can't answer, and the caller falls back to the in-memory roster.
+class StorageBackend:
+    incremental = False
+    writable = True  # False: edits stay in memory until Save As
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_changes(self, progress=None):
+        raise NotImplementedError
+
+    def apply(self, changes):
+        raise NotImplementedError
+
+    def save_all(self, students):
+        raise NotImplementedError
+
+    def needs_compaction(self):
+        return False
+
+    def watch_paths(self):
+        return [self.path] if self.writable else []
+
+    def sorted_ids(self, key, reverse):
+        return None
+
+    def journal_conflict(self):
+        # see TextFileBackend
+        return None
+
+# In journal mode each edit appends one line to <file>.journal instead of
+# rewriting the roster: "+<student line>" for an add/update, "-<id>" for a
+# delete. Loading replays the journal over the snapshot. Once the journal
+# passes JOURNAL_COMPACT_BYTES the backend asks for a compaction: a fresh
+# snapshot written by save_all, which also drops the journal.
+# A journal starts with a header naming the snapshot it applies to: size,
+# mtime and a digest of its contents. A new mtime alone (touch, backup and
+# sync tools) is checked against the digest. If another program has really
+# replaced the snapshot, the journal's edits are not in it: the journal is
+# not replayed, edits are refused (JournalConflict) rather than appended,
+# and journal_conflict() hands its changes to the caller to settle. The
+# save_all that follows folds the result into a new snapshot and drops it.
+JOURNAL_MODE = True
+JOURNAL_COMPACT_BYTES = 256 * 1024
+JOURNAL_HEADER = "# snapshot "
+
+class JournalConflict(OSError):
+    pass
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def atomic_write(filename, write, mode="w"):
+    # temp file + rename, so a crash mid-write never leaves a truncated roster
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(filename) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def write_snapshot(filename, lines):
+    def write(f):
+        f.write(str(len(lines)) + "\n")
+        for line in lines:
+            f.write(line + "\n")
+    atomic_write(filename, write)
+
+def parse_journal_line(line):
+    try:
+        if line.startswith("+"):
+            s = parse_student_line(line[1:])
+            return ("put", s) if s else None
+        if line.startswith("-"):
+            return ("delete", int(line[1:]))
+    except ValueError:
+        pass  # torn final line from a crash mid-append
+    return None
+
+class TextFileBackend(StorageBackend):
+    # the studentMarks.txt format, optionally with the write-ahead journal
+    def __init__(self, path, journal=JOURNAL_MODE):
+        super().__init__(path)
+        self.incremental = journal
+        self.journal = path + ".journal"
+        self._verified = None  # (header, snapshot signature) whose digest matched
+
+    def _snapshot_signature(self):
+        st = os.stat(self.path)
+        return f"{st.st_size} {st.st_mtime_ns}"
+
+    def _journal_header(self):
+        # the journal's first line; "" when there is no journal yet
+        try:
+            with open(self.journal, "r") as f:
+                return f.readline().strip()
+        except OSError:
+            return ""
+
+    def _matches(self, header):
+        # was the journal started on the snapshot as it is now?
+        signature, _, digest = header[len(JOURNAL_HEADER):].rpartition(" ")
+        current = self._snapshot_signature()
+        if signature == current or self._verified == (header, current):
+            return True
+        if file_digest(self.path) != digest:
+            return False
+        self._verified = (header, current)  # only re-stamped: no need to hash it again
+        return True
+
+    def journal_conflict(self):
+        # the journal's changes if the snapshot was replaced under it, else None
+        header = self._journal_header()
+        if not header or self._matches(header):
+            return None
+        with open(self.journal, "r") as f:
+            lines = [line.strip() for line in f]
+        return [change for change in map(parse_journal_line, lines) if change]
+
+    def iter_changes(self, progress=None):
+        if not os.path.exists(self.path):
+            # create empty file
+            with open(self.path, "w") as f:
+                f.write("0\n")
+        header = self._journal_header()
+        size = os.path.getsize(self.path) or 1
+        consumed = 0
+
+        def counted(f):
+            nonlocal consumed
+            for line in f:
+                consumed += len(line)
+                if progress:
+                    progress(consumed / size)
+                yield line
+
+        with open(self.path, "r") as file:
+            for s in iter_student_records(counted(file)):
+                yield ("put", s)
+        if header and self._matches(header):  # otherwise see journal_conflict
+            with open(self.journal, "r") as f:
+                for line in f:
+                    change = parse_journal_line(line.strip())
+                    if change:
+                        yield change
+
+    def apply(self, changes):
+        # the whole batch is one append and one fsync
+        header = self._journal_header()
+        if header and not self._matches(header):
+            raise JournalConflict(f"{self.path} was replaced by another program; "
+                                  f"{self.journal} holds edits that are not in it")
+        lines = [f"+{student_line(value)}" if op == "put" else f"-{value}" for op, value in changes]
+        if not header:
+            lines.insert(0, f"{JOURNAL_HEADER}{self._snapshot_signature()} {file_digest(self.path)}")
+        with open(self.journal, "a") as f:
+            f.write("".join(line + "\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save_all(self, students):
+        write_snapshot(self.path, [student_line(s) for s in students])
+        if os.path.exists(self.journal):
+            os.remove(self.journal)
+
+    def needs_compaction(self):
+        try:
+            return self.incremental and os.path.getsize(self.journal) > JOURNAL_COMPACT_BYTES
+        except OSError:
+            return False
+
+    def watch_paths(self):
+        return [self.path, self.journal]
+
+# SQLite keeps one row per student with indexes on name and total (id is
+# the primary key), so every edit is a single-row transaction and the
+# sort queries run in the database. (Highest/lowest come from RosterStats,
+# which already has every student bucketed.)
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+SQL_SORT_COLUMNS = {"id": "id", "name": "name COLLATE NOCASE", "total": "total", "percentage": "total"}
+
+class SQLiteBackend(StorageBackend):
+    incremental = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._local = threading.local()
+
+    def _connect(self):
+        import sqlite3
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS students ("
+                         "id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                         "c1 INTEGER NOT NULL, c2 INTEGER NOT NULL, c3 INTEGER NOT NULL, "
+                         "exam INTEGER NOT NULL, total INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS students_name ON students (name COLLATE NOCASE)")
+            conn.execute("CREATE INDEX IF NOT EXISTS students_total ON students (total)")
+        return conn
+
+    @property
+    def conn(self):
+        # one connection per thread (UI queries, the writer); iter_changes
+        # opens its own for the loader thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def iter_changes(self, progress=None):
+        conn = self._connect()
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM students").fetchone()[0] or 1
+            cursor = conn.execute("SELECT id, name, c1, c2, c3, exam FROM students ORDER BY id")
+            done = 0
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    yield ("put", Student(*row))
+                done += len(rows)
+                if progress:
+                    progress(done / count)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(s):
+        return (s.id, s.name, s.c1, s.c2, s.c3, s.exam, s.total)
+
+    def apply(self, changes):
+        # one transaction for the whole batch
+        with self.conn:
+            for op, value in changes:
+                if op == "put":
+                    self.conn.execute("INSERT INTO students (id, name, c1, c2, c3, exam, total) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                                      "ON CONFLICT(id) DO UPDATE SET name = excluded.name, c1 = excluded.c1, "
+                                      "c2 = excluded.c2, c3 = excluded.c3, exam = excluded.exam, total = excluded.total",
+                                      self._row(value))
+                else:
+                    self.conn.execute("DELETE FROM students WHERE id = ?", (value,))
+
+    def save_all(self, students):
+        with self.conn:
+            self.conn.execute("DELETE FROM students")
+            self.conn.executemany("INSERT INTO students (id, name, c1, c2, c3, exam, total) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  (self._row(s) for s in students))
+
+    def watch_paths(self):
+        return [self.path, self.path + "-wal"]
+
+    def sorted_ids(self, key, reverse):
+        column = SQL_SORT_COLUMNS.get(key)
+        if column is None or (key == "percentage" and not grading_scheme().proportional):
+            return None
+        if key == "name" and self.conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM students WHERE name GLOB '*[^ -~]*')").fetchone()[0]:
+            return None  # NOCASE only folds ASCII, sort_key's str.lower() folds everything
+        order = f"{column} DESC, id" if reverse else f"{column}, id"
+        return [row[0] for row in self.conn.execute(f"SELECT id FROM students ORDER BY {order}")]
+
+# -----------------------
+# Binary roster format
+# -----------------------
+# An .srb file is a header, one fixed-width record per student in roster
+# order, the UTF-8 names back to back, and an index of record numbers
+# sorted by student ID. MappedRoster maps it and decodes a record only
+# when it is asked for, so opening costs the same for ten rows or ten
+# million, record i is one unpack, and an ID lookup is a binary search.
+BINARY_EXTENSIONS = (".srb",)
+BINARY_MAGIC = b"SRB1"
+BINARY_HEADER = struct.Struct("<4sIQQQ")  # magic, record size, count, names offset, index offset
+BINARY_RECORD = struct.Struct("<q4iQI")   # id, c1, c2, c3, exam, name offset, name length
+BINARY_ID = struct.Struct("<q")           # the leading id of a record
+BINARY_INDEX = struct.Struct("<I")        # one record number
+
+def write_binary_roster(filename, students):
+    # records stream straight to disk; the header is filled in at the end
+    def write(f):
+        f.write(bytes(BINARY_HEADER.size))
+        names = bytearray()
+        ids = []
+        for s in students:
+            name = s["name"].encode("utf-8")
+            f.write(BINARY_RECORD.pack(s["id"], s["c1"], s["c2"], s["c3"], s["exam"], len(names), len(name)))
+            names += name
+            ids.append(s["id"])
+        names_at = BINARY_HEADER.size + len(ids) * BINARY_RECORD.size
+        f.write(names)
+        f.write(struct.pack(f"<{len(ids)}I", *sorted(range(len(ids)), key=ids.__getitem__)))
+        f.seek(0)
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_RECORD.size, len(ids), names_at, names_at + len(names)))
+    atomic_write(filename, write, "wb")
+
+class MappedRoster:
+    # Read-only Roster over an .srb file. Decoded records are kept, so a
+    # student is the same object every time it is read (views compare by
+    # identity). Edits need a Roster: Roster(mapped) copies it.
+    version = 0
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < BINARY_HEADER.size:
+            raise ValueError(f"{path} is not a binary roster")
+        magic, size, self._count, self._names_at, self._index_at = BINARY_HEADER.unpack_from(self._mm)
+        if magic != BINARY_MAGIC or size != BINARY_RECORD.size:
+            raise ValueError(f"{path} is not a binary roster")
+        self._loaded = {}  # record number -> Student
+
+    def __len__(self):
+        return self._count
+
+    def record(self, i):
+        s = self._loaded.get(i)
+        if s is None:
+            sid, c1, c2, c3, exam, at, length = BINARY_RECORD.unpack_from(self._mm, BINARY_HEADER.size + i * BINARY_RECORD.size)
+            name = self._mm[self._names_at + at:self._names_at + at + length].decode("utf-8")
+            s = self._loaded[i] = Student(sid, name, c1, c2, c3, exam)
+        return s
+
+    def __getitem__(self, i):
+        # list-style indexing, so a MappedRoster can stand in for the rows of a view
+        if isinstance(i, slice):
+            return [self.record(j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return self.record(i)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self.record(i)
+
+    def _find(self, sid):
+        # record number of sid, or None: binary search through the id index
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = BINARY_INDEX.unpack_from(self._mm, self._index_at + mid * BINARY_INDEX.size)[0]
+            found = BINARY_ID.unpack_from(self._mm, BINARY_HEADER.size + i * BINARY_RECORD.size)[0]
+            if found == sid:
+                return i
+            if found < sid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def __contains__(self, sid):
+        return self._find(sid) is not None
+
+    def get(self, sid):
+        i = self._find(sid)
+        return None if i is None else self.record(i)
+
+    def index(self, s):
+        i = self._find(s["id"])
+        if i is None or self.record(i) is not s:
+            raise ValueError(f"{s!r} is not in the roster")
+        return i
+
+    def columns(self):
+        # zero-copy (ids, c1, c2, c3, exam) arrays over the mapped records
+        table = np.frombuffer(self._mm, count=self._count, offset=BINARY_HEADER.size, dtype=np.dtype([
+            ("id", "<i8"), ("c1", "<i4"), ("c2", "<i4"), ("c3", "<i4"), ("exam", "<i4"),
+            ("name_at", "<u8"), ("name_len", "<u4")]))
+        return table["id"], table["c1"], table["c2"], table["c3"], table["exam"]
+
+class BinaryBackend(StorageBackend):
+    # edits rewrite the whole file; the GUI maps it through roster() instead
+    # of streaming iter_changes
+    def _ensure(self):
+        if not os.path.exists(self.path):
+            write_binary_roster(self.path, [])
+
+    def roster(self):
+        self._ensure()
+        return MappedRoster(self.path)
+
+    def iter_changes(self, progress=None):
+        roster = self.roster()
+        for i, s in enumerate(roster):
+            yield ("put", s)
+            if progress and i % 10000 == 0:
+                progress(i / len(roster))
+
+    def save_all(self, students):
+        write_binary_roster(self.path, students)
+
+def open_backend(path):
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SQLiteBackend(path)
+    if path.lower().endswith(BINARY_EXTENSIONS):
+        return BinaryBackend(path)
+    return TextFileBackend(path)
+
+def convert_roster(source, target):
+    # copy a roster between formats (text, SQLite, .srb), chosen by extension
+    students = load_student_data(source)
+    open_backend(target).save_all(students)
+    return len(students)
+
+# -----------------------
+# Bulk ingestion
+# -----------------------
+# One marks file per class, possibly thousands of them: RosterIngest parses
+# the files in a process pool (same rules as load_student_data) and merges
+# them in path order. A student ID already taken by an earlier file is a
+# collision: the first record is kept and the clash is listed in
+# collisions. Files that can't be read are listed in errors instead of
+# stopping the import. The merged roster has no file of its own.
+INGEST_PATTERN = "*.txt"    # files picked up from a directory
+INGEST_MIN_PARALLEL = 4     # fewer files than this are parsed in-process
+CAN_FORK = hasattr(os, "fork")
+
+def expand_roster_paths(specs):
+    # directories, glob patterns and plain file names -> list of files
+    if isinstance(specs, str):
+        specs = [specs]
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            paths.extend(sorted(glob.glob(os.path.join(spec, INGEST_PATTERN))))
+        elif glob.has_magic(spec):
+            paths.extend(sorted(glob.glob(spec)))
+        else:
+            paths.append(spec)  # a missing file is reported, not skipped
+    return list(dict.fromkeys(paths))
+
+def parse_roster_file(path):
+    # pool worker: (path, [(id, name, c1, c2, c3, exam), ...], error or None)
+    if not os.path.isfile(path):
+        return path, [], "No such file"
+    try:
+        rows = [(s.id, s.name, s.c1, s.c2, s.c3, s.exam) for s in load_student_data(path)]
+    except Exception as e:
+        return path, [], str(e) or type(e).__name__
+    return path, rows, None
+
+class RosterIngest(StorageBackend):
+    writable = False
+
+    def __init__(self, specs, workers=None):
+        super().__init__(specs if isinstance(specs, str) else " ".join(specs))
+        self.specs = specs
+        self.workers = workers  # None: one per core
+        self.files = 0
+        self.collisions = []    # (id, file kept, file skipped)
+        self.errors = []        # (file, message)
+
+    def iter_changes(self, progress=None):
+        paths = expand_roster_paths(self.specs)
+        self.files, self.collisions, self.errors = len(paths), [], []
+        owner = {}  # student id -> file it came from
+        for done, (path, rows, error) in enumerate(self._parse(paths), 1):
+            if error is not None:
+                self.errors.append((path, error))
+            for row in rows:
+                first = owner.setdefault(row[0], path)
+                if first != path:
+                    self.collisions.append((row[0], first, path))
+                else:
+                    yield ("put", Student(*row))
+            if progress:
+                progress(done / len(paths))
+
+    def _parse(self, paths):
+        if self.workers == 1 or len(paths) < INGEST_MIN_PARALLEL:
+            yield from map(parse_roster_file, paths)
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        # fork where we can: spawned workers re-import the calling script.
+        # Forking is only safe from a single-threaded caller such as the
+        # CLI; the GUI loads on a thread and passes workers=1.
+        context = multiprocessing.get_context("fork") if CAN_FORK else None
+        workers = self.workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            yield from pool.map(parse_roster_file, paths, chunksize=max(1, len(paths) // (workers * 8)))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def save_all(self, students):
+        raise ValueError("An imported roster has no file of its own; use Save As.")
+
+# -----------------------
+# Background writer
+# -----------------------
+# All writes to a backend go through one thread so the caller never waits
+# on the disk. The thread waits WRITE_COALESCE_MS after the first change
+# of a burst, keeps only the last change per student (a full save also
+# drops everything before it) and writes the batch with one apply() or
+# save_all(). Outcomes are queued on results for the caller to drain on
+# its own thread: ("saved", n, path), ("error", exception, path) and
+# ("compact",) when the backend wants a fresh full save.
+WRITE_COALESCE_MS = 150
+
+class BackgroundWriter:
+    def __init__(self, backend, watcher=None):
+        self.backend = backend
+        self.watcher = watcher  # a FileWatcher on backend that should not see our writes
+        self.results = queue.Queue()
+        self.error = None  # the last failure, cleared by the next good write
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @property
+    def pending(self):
+        # changes submitted but not written yet
+        return self._pending
+
+    def _submit(self, item, weight=1):
+        with self._lock:
+            self._pending += weight
+        self._queue.put(item)
+
+    def put(self, s):
+        # a copy, so later edits to s can't race the write
+        self._submit(("put", Student(*student_values(s))))
+
+    def delete(self, sid):
+        self._submit(("delete", sid))
+
+    def apply_many(self, changes):
+        # [("put", s) | ("delete", sid)] for a bulk change or an undo step:
+        # one submission, written as one batch
+        copied = [(op, Student(*student_values(value)) if op == "put" else value) for op, value in changes]
+        self._submit(("changes", copied), len(changes))
+
+    def save_all(self, students):
+        self._submit(("save_all", list(students)))
+
+    def flush(self):
+        # block until everything submitted so far has been written (or failed)
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait()
+
+    def close(self):
+        # finish the queued writes, then stop the thread
+        self.flush()
+        self._queue.put(("stop", None))
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + WRITE_COALESCE_MS / 1000.0
+        while batch[-1][0] not in ("flush", "stop"):
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            full, changes, count = None, {}, 0
+            for op, value in batch:
+                if op == "save_all":
+                    full, changes = value, {}
+                elif op == "changes":
+                    changes.update((v.id if o == "put" else v, (o, v)) for o, v in value)
+                elif op in ("put", "delete"):
+                    changes[value.id if op == "put" else value] = (op, value)
+                if op not in ("flush", "stop"):
+                    count += len(value) if op == "changes" else 1
+            if count:
+                self._write(full, list(changes.values()), count)
+            if batch[-1][0] == "flush":
+                batch[-1][1].set()
+            elif batch[-1][0] == "stop":
+                return
+
+    def _write(self, full, changes, count):
+        own = self.watcher.own_write() if self.watcher is not None else contextlib.nullcontext()
+        try:
+            with own:
+                if full is not None:
+                    with profiler.span("write (full)"):
+                        self.backend.save_all(full)
+                if changes:
+                    with profiler.span("write (changes)"):
+                        self.backend.apply(changes)
+        except Exception as e:
+            self.error = e
+            self.results.put(("error", e, self.backend.path))
+        else:
+            self.error = None
+            self.results.put(("saved", count, self.backend.path))
+            if self.backend.needs_compaction():
+                self.results.put(("compact",))
+        finally:
+            with self._lock:
+                self._pending -= count
+
+# -----------------------
+# Change detection
+# -----------------------
+# Other tools may write the roster file while it is open. FileWatcher polls
+# the backend's watch_paths() for a changed (mtime, size, inode); the
+# standard library has no portable inotify, and a couple of stat() calls a
+# second cost nothing. Our own writes go through own_write(), which moves
+# the baseline past them unless the files had already changed beforehand,
+# and counts them in writes: a read of the file that started before the
+# latest of our writes is out of date. reconcile() then compares what the
+# file holds with the roster, row by row.
+def file_signature(paths):
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+class FileWatcher:
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._lock = threading.Lock()
+        self._seen = file_signature(self.paths)
+        self.writes = 0  # own_write calls finished
+
+    def changed(self):
+        with self._lock:
+            return file_signature(self.paths) != self._seen
+
+    def sync(self):
+        # take the files as they are now as seen (call before reading them)
+        with self._lock:
+            self._seen = file_signature(self.paths)
+
+    @contextlib.contextmanager
+    def own_write(self):
+        with self._lock:
+            clean = file_signature(self.paths) == self._seen
+        yield
+        with self._lock:
+            self.writes += 1
+            if clean:
+                self._seen = file_signature(self.paths)
+
+def read_roster_values(backend):
+    # {id: student_values} of what the backend holds now
+    values = {}
+    for op, value in backend.iter_changes():
+        if op == "put":
+            values[value.id] = student_values(value)
+        else:
+            values.pop(value, None)
+    return values
+
+def replay_values(changes):
+    # {id: values (None: deleted)} left by a run of ("put", s) / ("delete", id)
+    values = {}
+    for op, value in changes:
+        if op == "put":
+            values[value.id] = student_values(value)
+        else:
+            values[value] = None
+    return values
+
+def step_to(s, values):
+    # the step taking record s (None: absent) to values (None: deleted)
+    if s is None:
+        return ("insert", values) if values is not None else None
+    if values is None:
+        return ("delete", student_values(s))
+    diff = tuple((f, s[f], v) for f, v in zip(EDIT_FIELDS, values[1:]) if s[f] != v)
+    return ("update", s.id, diff) if diff else None
+
+def reconcile(students, fresh, unsaved):
+    # fresh: read_roster_values() of the file; unsaved: {id: values before
+    # the first local edit not yet written, None if added}. Returns
+    # (step, conflicts): a bulk step applying the rows only the file changed,
+    # and [(id, ours, theirs)] (values, None if absent) for rows changed on
+    # both sides. A row whose file copy still matches its unsaved baseline
+    # is our own edit on its way out, not a change.
+    steps, conflicts = [], []
+
+    def check(sid, s, theirs):
+        if sid in unsaved:
+            if theirs != unsaved[sid]:
+                conflicts.append((sid, student_values(s) if s is not None else None, theirs))
+            return
+        step = step_to(s, theirs)
+        if step is not None:
+            steps.append(step)
+
+    for sid, theirs in fresh.items():
+        s = students.get(sid)
+        if s is None or student_values(s) != theirs:
+            check(sid, s, theirs)
+    for s in students:
+        if s.id not in fresh:
+            check(s.id, s, None)
+    return ("bulk", tuple(steps)), conflicts
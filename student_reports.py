@@ -0,0 +1,302 @@
+"""
+Student Manager — term-end reports
+
+    python student_cli.py studentMarks.txt --reports reports/
+    python student_cli.py studentMarks.txt --reports reports/ --report-format txt --title "Spring Term"
+
+Renders one transcript per student (transcripts/<id>.html) and a class
+report with the grade distribution (class_report.html), as HTML with
+print styles (Print → Save as PDF gives one page per transcript) or as
+plain text. Templates are compiled once at import. Transcripts are
+rendered in a process pool for large rosters and written to disk as they
+are produced, so memory stays flat. A manifest of content hashes lets a
+re-run skip every student whose marks (and title and grading scheme)
+have not changed.
+"""
+
+import hashlib
+import html
+import os
+import string
+import time
+
+from student_core import CAN_FORK, RosterStats, atomic_write, grading_scheme, student_values
+
+REPORT_FORMATS = ("html", "txt")
+REPORT_VERSION = 1           # bump when a template changes: every transcript is rendered again
+REPORT_MANIFEST = ".report-hashes"
+REPORT_CHUNK = 500           # students per worker task
+REPORT_MIN_PARALLEL = 2000   # fewer changed students than this are rendered in-process
+TRANSCRIPT_DIR = "transcripts"
+
+# -----------------------
+# Templates
+# -----------------------
+# A template is str.format syntax ({field} or {field:spec}), split once
+# into literal text and fields by compile_template; rendering is then one
+# join with no parsing.
+def compile_template(text):
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        if literal:
+            parts.append((literal, None, None))
+        if field is not None:
+            parts.append((None, field, spec or ""))
+    return parts
+
+def render(template, fields):
+    return "".join(literal if literal is not None else format(fields[field], spec)
+                   for literal, field, spec in template)
+
+PRINT_CSS = """
+  @page { size: A4; margin: 20mm; }
+  body { font-family: Helvetica, Arial, sans-serif; color: #222; }
+  h1 { font-size: 14pt; color: #555; margin: 0; }
+  h2 { font-size: 20pt; margin: 4pt 0; }
+  .sub { color: #666; margin-top: 0; }
+  table { border-collapse: collapse; margin-top: 12pt; }
+  th, td { border-bottom: 1px solid #ccc; padding: 4pt 12pt 4pt 0; text-align: left; }
+  td.num { text-align: right; }
+  .grade { font-size: 16pt; font-weight: bold; }
+  .bar { background: #6C8CFF; height: 10pt; }
+"""
+
+HTML_TRANSCRIPT = compile_template("""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Transcript — {name}</title><style>{css}</style></head>
+<body>
+<h1>{title}</h1>
+<h2>{name}</h2>
+<p class="sub">Student ID {id}</p>
+<table>
+<tr><th>Coursework 1</th><td class="num">{c1}</td><td>/ {c1_max}</td></tr>
+<tr><th>Coursework 2</th><td class="num">{c2}</td><td>/ {c2_max}</td></tr>
+<tr><th>Coursework 3</th><td class="num">{c3}</td><td>/ {c3_max}</td></tr>
+<tr><th>Coursework total</th><td class="num">{coursework}</td><td>/ {coursework_max}</td></tr>
+<tr><th>Exam</th><td class="num">{exam}</td><td>/ {exam_max}</td></tr>
+<tr><th>Total</th><td class="num">{total}</td><td>/ {total_max}</td></tr>
+<tr><th>Percentage</th><td class="num">{percentage:.2f}%</td><td></td></tr>
+<tr><th>Grade</th><td class="num grade">{grade}</td><td></td></tr>
+</table>
+</body></html>
+""")
+
+TEXT_TRANSCRIPT = compile_template("""{title}
+{name}
+Student ID {id}
+
+  Coursework 1      {c1:>6} / {c1_max}
+  Coursework 2      {c2:>6} / {c2_max}
+  Coursework 3      {c3:>6} / {c3_max}
+  Coursework total  {coursework:>6} / {coursework_max}
+  Exam              {exam:>6} / {exam_max}
+  Total             {total:>6} / {total_max}
+  Percentage        {percentage:>6.2f}%
+  Grade             {grade:>6}
+""")
+
+HTML_CLASS = compile_template("""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Class report — {title}</title><style>{css}</style></head>
+<body>
+<h1>{title}</h1>
+<h2>Class report</h2>
+<p class="sub">{count} students · generated {generated}</p>
+<table>
+<tr><th>Mean</th><td class="num">{mean}</td></tr>
+<tr><th>Median</th><td class="num">{median}</td></tr>
+<tr><th>Coursework average</th><td class="num">{mean_coursework}</td></tr>
+<tr><th>Exam average</th><td class="num">{mean_exam}</td></tr>
+<tr><th>Highest</th><td>{highest}</td></tr>
+<tr><th>Lowest</th><td>{lowest}</td></tr>
+</table>
+<table>
+<tr><th>Grade</th><th>Students</th><th>Share</th><th></th></tr>
+{grade_rows}
+</table>
+</body></html>
+""")
+
+HTML_GRADE_ROW = compile_template(
+    '<tr><th>{grade}</th><td class="num">{count}</td><td class="num">{share:.1f}%</td>'
+    '<td><div class="bar" style="width: {width}pt"></div></td></tr>')
+
+TEXT_CLASS = compile_template("""{title}
+Class report — {count} students, generated {generated}
+
+  Mean                {mean}
+  Median              {median}
+  Coursework average  {mean_coursework}
+  Exam average        {mean_exam}
+  Highest             {highest}
+  Lowest              {lowest}
+
+  Grade  Students   Share
+{grade_rows}
+""")
+
+TEXT_GRADE_ROW = compile_template("  {grade:<5}  {count:>8}  {share:>5.1f}%  {bar}")
+
+TEMPLATES = {  # format -> (transcript, class report, grade row)
+    "html": (HTML_TRANSCRIPT, HTML_CLASS, HTML_GRADE_ROW),
+    "txt": (TEXT_TRANSCRIPT, TEXT_CLASS, TEXT_GRADE_ROW),
+}
+
+# -----------------------
+# Transcripts
+# -----------------------
+def transcript_fields(values, title, fmt, scheme):
+    sid, name, c1, c2, c3, exam = values
+    coursework, total, percentage, grade = scheme.metrics(c1, c2, c3, exam)
+    limits = scheme.maximums
+    escape = html.escape if fmt == "html" else str
+    return {"id": sid, "name": escape(name), "title": escape(title), "css": PRINT_CSS,
+            "c1": c1, "c2": c2, "c3": c3, "exam": exam, "coursework": coursework, "total": total,
+            "percentage": percentage, "grade": grade,
+            "c1_max": limits["c1"], "c2_max": limits["c2"], "c3_max": limits["c3"],
+            "coursework_max": limits["c1"] + limits["c2"] + limits["c3"],
+            "exam_max": limits["exam"], "total_max": scheme.total_max}
+
+def transcript_hash(values, title, fmt, scheme):
+    # everything a transcript shows comes from these, so equal hashes mean equal files
+    key = repr((REPORT_VERSION, fmt, title, scheme.signature(), values)).encode("utf-8")
+    return hashlib.blake2b(key, digest_size=12).hexdigest()
+
+def transcript_path(out_dir, sid, fmt):
+    return os.path.join(out_dir, TRANSCRIPT_DIR, f"{sid}.{fmt}")
+
+def render_transcripts(out_dir, fmt, title, scheme, rows):
+    # write one file per row of student_values; runs in the worker processes
+    # (scheme is passed along, as a spawned worker only has the standard one)
+    template = TEMPLATES[fmt][0]
+    for values in rows:
+        with open(transcript_path(out_dir, values[0], fmt), "w", encoding="utf-8") as f:
+            f.write(render(template, transcript_fields(values, title, fmt, scheme)))
+    return [values[0] for values in rows]
+
+# -----------------------
+# Class report
+# -----------------------
+def class_report(students, fmt, title):
+    stats = RosterStats()
+    summary = stats.summary(students)
+    n = summary["count"]
+    _, template, row_template = TEMPLATES[fmt]
+    escape = html.escape if fmt == "html" else str
+
+    def describe(s):
+        return escape(f"{s.name} (ID {s.id}), {s.percentage:.2f}%") if s is not None else "–"
+
+    most = max(summary["grades"].values(), default=0) or 1
+    rows = [render(row_template, {"grade": g, "count": summary["grades"].get(g, 0),
+                                  "share": 100.0 * summary["grades"].get(g, 0) / n if n else 0.0,
+                                  "width": round(200 * summary["grades"].get(g, 0) / most),
+                                  "bar": "#" * round(30 * summary["grades"].get(g, 0) / most)})
+            for g in summary["grades"]]
+    return render(template, {
+        "title": escape(title), "css": PRINT_CSS, "count": n, "generated": time.strftime("%Y-%m-%d %H:%M"),
+        "mean": f"{summary['mean_percentage']:.2f}%" if n else "–",
+        "median": f"{summary['median_percentage']:.2f}%" if n else "–",
+        "mean_coursework": f"{summary['mean_coursework']:.1f}" if n else "–",
+        "mean_exam": f"{summary['mean_exam']:.1f}" if n else "–",
+        "highest": describe(stats.extreme(students, True) if n else None),
+        "lowest": describe(stats.extreme(students, False) if n else None),
+        "grade_rows": "\n".join(rows),
+    })
+
+# -----------------------
+# Report runs
+# -----------------------
+def read_manifest(out_dir, fmt):
+    # student id -> transcript hash from the last run
+    hashes = {}
+    try:
+        with open(os.path.join(out_dir, f"{REPORT_MANIFEST}.{fmt}"), encoding="utf-8") as f:
+            for line in f:
+                sid, _, digest = line.strip().partition(" ")
+                if digest:
+                    hashes[int(sid)] = digest
+    except (OSError, ValueError):
+        return {}
+    return hashes
+
+def write_manifest(out_dir, fmt, hashes):
+    atomic_write(os.path.join(out_dir, f"{REPORT_MANIFEST}.{fmt}"),
+                 lambda f: f.writelines(f"{sid} {digest}\n" for sid, digest in hashes.items()))
+
+def render_chunks(out_dir, fmt, title, scheme, todo, workers):
+    # yields the ids of each finished chunk; at most two chunks per worker
+    # are in flight, so the rows waiting to be rendered stay bounded
+    chunks = (todo[i:i + REPORT_CHUNK] for i in range(0, len(todo), REPORT_CHUNK))
+    if workers == 1 or len(todo) < REPORT_MIN_PARALLEL:
+        for chunk in chunks:
+            yield render_transcripts(out_dir, fmt, title, scheme, chunk)
+        return
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    import multiprocessing
+    # fork where we can, as RosterIngest does (so only from single-threaded
+    # callers; the GUI renders on a thread and passes workers=1)
+    context = multiprocessing.get_context("fork") if CAN_FORK else None
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    try:
+        running = set()
+        for chunk in chunks:
+            running.add(pool.submit(render_transcripts, out_dir, fmt, title, scheme, chunk))
+            if len(running) >= workers * 2:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in running:
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def generate_reports(students, out_dir, fmt="html", title="Student Transcript", workers=None,
+                     progress=None, cancel=None):
+    # render every transcript whose hash changed, drop those of students
+    # no longer in the roster, then write the class report. progress(fraction)
+    # is called per chunk; a set cancel (threading.Event) stops after the
+    # current chunk with the manifest still matching the files on disk.
+    # Returns {"rendered", "skipped", "removed", "class_report", "cancelled"}.
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r}")
+    os.makedirs(os.path.join(out_dir, TRANSCRIPT_DIR), exist_ok=True)
+    scheme = grading_scheme()
+    old = read_manifest(out_dir, fmt)
+    hashes, todo, skipped = {}, [], 0
+    for s in students:
+        values = student_values(s)
+        digest = transcript_hash(values, title, fmt, scheme)
+        if old.get(s.id) == digest and os.path.exists(transcript_path(out_dir, s.id, fmt)):
+            hashes[s.id] = digest
+            skipped += 1
+        else:
+            todo.append((values, digest))
+    removed = [sid for sid in old if sid not in students]
+    for sid in removed:
+        try:
+            os.remove(transcript_path(out_dir, sid, fmt))
+        except OSError:
+            pass
+
+    digests = {values[0]: digest for values, digest in todo}
+    rendered = 0
+    cancelled = False
+    try:
+        for ids in render_chunks(out_dir, fmt, title, scheme, [values for values, digest in todo], workers):
+            for sid in ids:
+                hashes[sid] = digests[sid]
+            rendered += len(ids)
+            if progress:
+                progress(rendered / len(todo))
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+    finally:
+        write_manifest(out_dir, fmt, hashes)
+
+    path = os.path.join(out_dir, f"class_report.{fmt}")
+    if not cancelled:
+        report = class_report(students, fmt, title)
+        atomic_write(path, lambda f: f.write(report.encode("utf-8")), "wb")
+    return {"rendered": rendered, "skipped": skipped, "removed": len(removed), "class_report": path,
+            "cancelled": cancelled}